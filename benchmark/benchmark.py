@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+# Measure the runner overhead with epos_stub.py in place of EPOS
+# e.g. benchmark.py --tasks 1000 10000 --parallel 8 --targets sandbox single_thread
+
+import argparse
+import csv
+import heapq
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Any, Optional
+
+BENCHMARK_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARK_DIR)
+STUB_PATH = os.path.join(BENCHMARK_DIR, "epos_stub.py")
+SINGLE_THREAD_PATH = os.path.join(ROOT_DIR, "old", "epos_SingleThread.py")
+WORKSPACE_PATH = os.path.join(ROOT_DIR, "workspace")
+TEMPLATE_FILE = "epos.template.properties"
+JAR_FILE = "IEPOS-Tutorial.jar"
+EVENTS_FILE = "events.txt"
+# Every task gets its own seed, so no two tasks share properties
+TASK_PARAM = "strategy.reorganizationSeed"
+# "paraller": ParallerExecutor, one launch per second
+# "sandbox": ParallerExecutor with SANDBOX_MODE
+# "single_thread": old/epos_SingleThread.py, always one task at a time
+TARGETS = ("paraller", "sandbox", "single_thread")
+
+
+def _write_java_shim(bin_dir: str):
+    os.makedirs(bin_dir, exist_ok=True)
+    shim_path = os.path.join(bin_dir, "java")
+    with open(shim_path, "w") as f:
+        f.write(f"#!/bin/sh\nexec \"{sys.executable}\" \"{STUB_PATH}\" \"$@\"\n")
+    os.chmod(shim_path, os.stat(shim_path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def _prepare_workspace(workspace_dir: str):
+    os.makedirs(workspace_dir)
+    shutil.copytree(os.path.join(WORKSPACE_PATH, "conf"), os.path.join(workspace_dir, "conf"))
+    os.symlink(os.path.join(WORKSPACE_PATH, "datasets"), os.path.join(workspace_dir, "datasets"), target_is_directory=True)
+    shutil.copyfile(os.path.join(WORKSPACE_PATH, TEMPLATE_FILE), os.path.join(workspace_dir, TEMPLATE_FILE))
+    # Never read by the stub
+    open(os.path.join(workspace_dir, JAR_FILE), "w").close()
+
+
+def _prepare_single_thread(work_dir: str):
+    os.makedirs(os.path.join(work_dir, "conf"))
+    os.makedirs(os.path.join(work_dir, "output"))
+    shutil.copyfile(SINGLE_THREAD_PATH, os.path.join(work_dir, os.path.basename(SINGLE_THREAD_PATH)))
+    shutil.copyfile(os.path.join(WORKSPACE_PATH, TEMPLATE_FILE), os.path.join(work_dir, TEMPLATE_FILE))
+
+
+def _task_values(tasks: int) -> List[str]:
+    return [str(i) for i in range(tasks)]
+
+
+# Runs in a child process, so every scenario starts with a fresh logger and event loop
+def _run_executor(spec: Dict[str, Any]) -> int:
+    sys.path.insert(0, ROOT_DIR)
+    import config
+    from epos_runner import ParallerExecutor, Properties, LogPolicy, RetentionPolicy
+
+    workspace_dir = spec["workspace"]
+    template = Properties.load_file(os.path.join(workspace_dir, TEMPLATE_FILE))
+    params = {TASK_PARAM: _task_values(spec["tasks"])}
+    executor = ParallerExecutor(workspace_dir, spec["report_path"], spec["parallel"], template, params, config.ANALYZER,
+                                sandbox=spec["target"] == "sandbox", analysis_size=spec["analysis_size"],
+                                report_backend=spec["report_backend"], log_policy=LogPolicy(spec["log_mode"]),
+                                retention=RetentionPolicy(spec["retention"]))
+    return len(executor.run())
+
+
+def _single_thread_script(tasks: int) -> str:
+    module = os.path.splitext(os.path.basename(SINGLE_THREAD_PATH))[0]
+    return (f"import {module} as m\n"
+            f"m.TEST_PARAMS = {{{TASK_PARAM!r}: {_task_values(tasks)!r}}}\n"
+            f"m.SHOW_TEST_PARAMS = False\n"
+            f"m.SHOW_EVERY_ANALYSE_REPORT = False\n"
+            f"m.main()\n")
+
+
+def _count_rows(csv_path: str) -> int:
+    if not os.path.isfile(csv_path):
+        return 0
+    with open(csv_path, "r", newline="") as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    if len(values) == 0:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+# Scheduling latency: time between a stub exiting and the next stub starting in the freed slot
+def _analyze_events(events_path: str, parallel: int) -> Dict[str, Any]:
+    runs = []
+    if os.path.isfile(events_path):
+        with open(events_path, "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3:
+                    runs.append((float(parts[0]), float(parts[1])))
+    if len(runs) == 0:
+        return {"launches": 0}
+    events = sorted([(start, 1) for start, _ in runs] + [(end, 0) for _, end in runs])
+    free_slots: List[float] = []
+    initial_slots = parallel
+    latencies = []
+    for timestamp, is_start in events:
+        if not is_start:
+            heapq.heappush(free_slots, timestamp)
+        elif initial_slots > 0:
+            initial_slots -= 1
+        elif len(free_slots) > 0:
+            latencies.append(timestamp - heapq.heappop(free_slots))
+    first_start = min(i[0] for i in runs)
+    last_start = max(i[0] for i in runs)
+    return {
+        "launches": len(runs),
+        "launches_per_second": (len(runs) - 1) / (last_start - first_start) if last_start > first_start else None,
+        "busy_second": sum(end - start for start, end in runs),
+        "latency_mean_second": sum(latencies) / len(latencies) if len(latencies) > 0 else None,
+        "latency_p50_second": _percentile(latencies, 50),
+        "latency_p95_second": _percentile(latencies, 95),
+        "latency_p99_second": _percentile(latencies, 99),
+    }
+
+
+def run_scenario(args: argparse.Namespace, target: str, tasks: int, scratch_dir: str) -> Dict[str, Any]:
+    scenario_dir = os.path.join(scratch_dir, f"{target}-{tasks}")
+    work_dir = os.path.join(scenario_dir, "workspace")
+    events_path = os.path.join(scenario_dir, EVENTS_FILE)
+    parallel = 1 if target == "single_thread" else args.parallel
+    env = dict(os.environ)
+    env["PATH"] = os.path.join(scratch_dir, "bin") + os.pathsep + env.get("PATH", "")
+    env["EPOS_STUB_DURATION"] = str(args.duration)
+    env["EPOS_STUB_MODE"] = args.mode
+    env["EPOS_STUB_LOG_LINES"] = str(args.log_lines)
+    env["EPOS_STUB_EVENTS"] = events_path
+    env["EPOS_RUNNER_LOG_PATH"] = os.path.join(scenario_dir, "epos-runner.log")
+    if target == "single_thread":
+        _prepare_single_thread(work_dir)
+        report_path = os.path.join(work_dir, "results.csv")
+        cmd = [sys.executable, "-c", _single_thread_script(tasks)]
+    else:
+        _prepare_workspace(work_dir)
+        report_path = os.path.join(scenario_dir, "result.db" if args.report_backend == "sqlite" else "result.csv")
+        spec = dict(target=target, workspace=work_dir, report_path=report_path, tasks=tasks, parallel=parallel,
+                    analysis_size=args.analysis_size, report_backend=args.report_backend, log_mode=args.log_mode,
+                    retention=args.retention)
+        cmd = [sys.executable, os.path.realpath(__file__), "--child", json.dumps(spec)]
+    with open(os.path.join(scenario_dir, "stdout.log"), "wb") as stdout:
+        start_second = time.time()
+        exit_value = subprocess.call(cmd, cwd=work_dir, env=env, stdout=stdout, stderr=subprocess.STDOUT)
+        wall_second = time.time() - start_second
+    if target == "single_thread" or args.report_backend == "csv":
+        reports = _count_rows(report_path)
+    else:
+        import sqlite3
+        with sqlite3.connect(report_path) as connection:
+            reports = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    result = dict(target=target, tasks=tasks, parallel=parallel, exit_value=exit_value, wall_second=wall_second, reports=reports,
+                  reports_per_second=reports / wall_second if wall_second > 0 else None)
+    result.update(_analyze_events(events_path, parallel))
+    busy_second = result.get("busy_second", 0)
+    # Share of the slot time not spent inside the stub
+    result["overhead_ratio"] = 1 - busy_second / (wall_second * parallel) if wall_second > 0 else None
+    if not args.keep:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+def _format(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+
+def print_results(results: List[Dict[str, Any]]):
+    columns = ["target", "tasks", "parallel", "exit_value", "wall_second", "reports", "reports_per_second", "launches_per_second",
+               "latency_mean_second", "latency_p50_second", "latency_p95_second", "latency_p99_second", "overhead_ratio"]
+    rows = [columns] + [[_format(result.get(i)) for i in columns] for result in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    for row in rows:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Runner overhead benchmark with a stub in place of EPOS")
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000], help="Task amounts, one scenario each")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=["sandbox", "single_thread"])
+    parser.add_argument("--parallel", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=0.0, help="Seconds every stub run takes")
+    parser.add_argument("--mode", choices=("sleep", "cpu"), default="sleep", help="How the stub spends its duration")
+    parser.add_argument("--log-lines", type=int, default=20, help="Extra lines printed by every stub run")
+    parser.add_argument("--analysis-size", type=int, default=1)
+    parser.add_argument("--report-backend", choices=("csv", "sqlite"), default="csv")
+    parser.add_argument("--log-mode", choices=("chunks", "direct"), default="chunks")
+    parser.add_argument("--retention", choices=("keep", "keep_used", "archive", "delete"), default="delete")
+    parser.add_argument("--scratch-dir", help="Where scenarios run, a temp dir by default")
+    parser.add_argument("--keep", action="store_true", help="Keep the workspaces of all scenarios")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to a json file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.child is not None:
+        _run_executor(json.loads(args.child))
+        return
+    if args.parallel < 1:
+        raise ValueError("Parallel size must >= 1!")
+    scratch_dir = args.scratch_dir if args.scratch_dir is not None else tempfile.mkdtemp(prefix="epos-benchmark-")
+    os.makedirs(scratch_dir, exist_ok=True)
+    _write_java_shim(os.path.join(scratch_dir, "bin"))
+    print(f"Scratch dir: {scratch_dir}")
+    results = []
+    for tasks in args.tasks:
+        for target in args.targets:
+            print(f"Running {target} with {tasks} tasks ... ...", flush=True)
+            results.append(run_scenario(args, target, tasks, scratch_dir))
+    print()
+    print_results(results)
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+# Stand-in for 'java -jar IEPOS-Tutorial.jar [properties]' used by benchmark.py
+# Prints the EPOS banner, writes EPOSOutput files of enabled loggers and sleeps or burns CPU
+# EPOS_STUB_DURATION: seconds per run, EPOS_STUB_MODE: "sleep" or "cpu", EPOS_STUB_LOG_LINES: extra log lines
+# EPOS_STUB_EVENTS: append "<start> <end> <pid>" of every run to this file
+
+import importlib.util
+import os
+import random
+import sys
+import time
+
+START_TIME = time.time()
+
+
+# Only epos_files.py is loaded, importing the package would load numpy, sqlite and the runner log into every run
+def _load_epos_files():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "epos_runner", "epos_files.py")
+    spec = importlib.util.spec_from_file_location("epos_files", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+_epos_files = _load_epos_files()
+EPOSOutput, EPOSLogger, EPOSFolder = _epos_files.EPOSOutput, _epos_files.EPOSLogger, _epos_files.EPOSFolder
+
+DEFAULT_PROPERTIES_PATH = os.path.join(EPOSFolder.CONF_DIR, "epos.properties")
+
+
+def read_properties(file_path: str) -> dict:
+    properties = {}
+    with open(file_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            properties[key.strip()] = value.strip().strip("\"'")
+    return properties
+
+
+def write_csv(file_path: str, header: list, rows: list):
+    with open(file_path, "w") as f:
+        f.write(",".join(header) + "\n")
+        for row in rows:
+            f.write(",".join(str(i) for i in row) + "\n")
+
+
+# Every run slowly converges from a random start like a real global cost
+def cost_rows(rnd: random.Random, iterations: int, simulations: int) -> list:
+    runs = [[rnd.uniform(50, 100) / (1 + i * rnd.uniform(0.1, 0.5)) for i in range(iterations)] for _ in range(simulations)]
+    rows = []
+    for i in range(iterations):
+        values = [run[i] for run in runs]
+        mean = sum(values) / simulations
+        stdev = (sum((v - mean) ** 2 for v in values) / simulations) ** 0.5
+        rows.append([i, mean, stdev] + values)
+    return rows
+
+
+def write_outputs(output_dir: str, properties: dict, rnd: random.Random):
+    iterations = int(properties.get("numIterations", 40))
+    simulations = int(properties.get("numSimulations", 5))
+    agents = int(properties.get("numAgents", 100))
+    plans = int(properties.get("numPlans", 10))
+    plan_dim = int(properties.get("planDim", 100))
+    run_header = ["Iteration", "Mean", "Stdev"] + [f"Run-{i}" for i in range(simulations)]
+    enabled = {file: properties.get(name, "false") == "true" for name, file in EPOSLogger.OUTPUT_FILES.items()}
+    for file in (EPOSOutput.GLOBAL_COST_CSV_FILE, EPOSOutput.LOCAL_COST_CSV_FILE, EPOSOutput.UNFAIRNESS_CSV_FILE,
+                 EPOSOutput.GLOBAL_COMPLEX_COST_CSV_FILE):
+        if enabled[file]:
+            write_csv(os.path.join(output_dir, file), run_header, cost_rows(rnd, iterations, simulations))
+    if enabled[EPOSOutput.NUM_REORGANIZATIONS_CSV_FILE]:
+        write_csv(os.path.join(output_dir, EPOSOutput.NUM_REORGANIZATIONS_CSV_FILE), run_header,
+                  [[i, 0, 0] + [0] * simulations for i in range(iterations)])
+    if enabled[EPOSOutput.WEIGHTS_ALPHA_BETA_CSV_FILE]:
+        alpha, beta = (properties.get("weightsString", "0,0").split(",") + ["0"])[:2]
+        write_csv(os.path.join(output_dir, EPOSOutput.WEIGHTS_ALPHA_BETA_CSV_FILE), ["Iteration", "Alpha", "Beta"],
+                  [[i, alpha, beta] for i in range(iterations)])
+    if enabled[EPOSOutput.TERMINATIONS_CSV_FILE]:
+        write_csv(os.path.join(output_dir, EPOSOutput.TERMINATIONS_CSV_FILE), ["Run", "Termination"],
+                  [[i, iterations - 1] for i in range(simulations)])
+    if enabled[EPOSOutput.SELECTED_PLANS_CSV_FILE]:
+        write_csv(os.path.join(output_dir, EPOSOutput.SELECTED_PLANS_CSV_FILE), ["Run", "Iteration"] + [f"agent-{i}" for i in range(agents)],
+                  [[r, i] + [rnd.randrange(plans) for _ in range(agents)] for r in range(simulations) for i in range(iterations)])
+    if enabled[EPOSOutput.GLOBAL_RESPONSE_CSV_FILE]:
+        write_csv(os.path.join(output_dir, EPOSOutput.GLOBAL_RESPONSE_CSV_FILE), ["Run", "Iteration"] + [f"dim-{i}" for i in range(plan_dim)],
+                  [[r, i] + [rnd.gauss(0, 1) for _ in range(plan_dim)] for r in range(simulations) for i in range(iterations)])
+    if enabled[EPOSOutput.INDEX_HISTOGRAM_CSV_FILE]:
+        write_csv(os.path.join(output_dir, EPOSOutput.INDEX_HISTOGRAM_CSV_FILE), ["Plan index", "Frequency"],
+                  [[i, rnd.randrange(agents)] for i in range(plans)])
+    with open(os.path.join(output_dir, EPOSOutput.USED_CONF_TXT_FILE), "w") as f:
+        for key, value in properties.items():
+            f.write(f"{key} = {value}\n")
+
+
+def main():
+    args = sys.argv[1:]
+    if args == ["-version"]:
+        print('openjdk version "0" (EPOS stub)', file=sys.stderr)
+        return 0
+    # Skip JVM options and the jar
+    rest = args[args.index("-jar") + 2:] if "-jar" in args else []
+    properties = read_properties(rest[0] if len(rest) > 0 else DEFAULT_PROPERTIES_PATH)
+    output_name = os.path.join(EPOSFolder.OUTPUT_DIR, f"{properties.get('dataset', 'gaussian')}_{int(START_TIME * 1000)}")
+    os.makedirs(output_name, exist_ok=True)
+    print("EPOS stub")
+    print("CONFIGURATION")
+    print(f"output={output_name}", flush=True)
+    duration = float(os.getenv("EPOS_STUB_DURATION", "0"))
+    if os.getenv("EPOS_STUB_MODE", "sleep") == "cpu":
+        while time.time() - START_TIME < duration:
+            pass
+    elif duration > 0:
+        time.sleep(duration)
+    write_outputs(output_name, properties, random.Random(str(sorted(properties.items()))))
+    for i in range(int(os.getenv("EPOS_STUB_LOG_LINES", "20"))):
+        print(f"Simulation {i}")
+    print("IEPOS Finished", flush=True)
+    events_path = os.getenv("EPOS_STUB_EVENTS")
+    if events_path is not None:
+        # One small O_APPEND write per run, safe with concurrent stubs
+        fd = os.open(events_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, f"{START_TIME} {time.time()} {os.getpid()}\n".encode())
+        finally:
+            os.close(fd)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
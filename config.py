@@ -1,17 +1,64 @@
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional, Any, Callable
 
 # noinspection PyUnresolvedReferences
 from epos_runner.analyzer import AbstractAnalyzer
 # noinspection PyUnresolvedReferences
-from epos_runner.utils import generate_weights, report_minium_global_cost
+from epos_runner.epos_files import EPOSOutput
+# noinspection PyUnresolvedReferences
+from epos_runner.jvm import JVMProfile
+# noinspection PyUnresolvedReferences
+from epos_runner.log_pump import LogPolicy
+# noinspection PyUnresolvedReferences
+from epos_runner.retention import RetentionPolicy
+# noinspection PyUnresolvedReferences
+from epos_runner.sampler import AbstractSampler, Conditional, ParamRange, GridSampler, RandomSampler, LatinHypercubeSampler, SobolSampler
+# noinspection PyUnresolvedReferences
+from epos_runner.search import SuccessiveHalvingSearch, HyperbandSearch
+# noinspection PyUnresolvedReferences
+from epos_runner.utils import generate_weights, report_minium_global_cost, prune_by_global_cost
 
 # Executor parallel size
 PARALLEL_SIZE = 4
+# Processes running Analyzer.generate_report, finished EPOS runs wait when all of them are busy
+ANALYSIS_PARALLEL_SIZE = 1
 # Show params before all tasks start
 PRINT_PARAMS = True
 # Show best result after all task finished
 PRINT_BEST_RESULT = True
+# Reports are summarized while they arrive: best report, best TOP_K reports of every analyzer objective
+# and their Pareto front (thinned to PARETO_FRONT_SIZE reports), shown live in the metrics status
+# Only a SEARCH keeps every report in memory, the result store still gets all of them
+TOP_K = 10
+PARETO_FRONT_SIZE = 256
+# Run every task in its own working dir under executor/<timestamp>/sandbox
+# Output folders can't collide, so launches are no longer limited to one per second
+SANDBOX_MODE = False
+# JVM options for every EPOS launch, None runs plain 'java -jar'
+# e.g. JVMProfile(class_data_sharing=True, tiered_stop_at_level=1, max_heap_size="1g", gc="Serial")
+# class_data_sharing dumps an AppCDS archive into workspace/cds once and reuses it (JDK 13+)
+JVM_PROFILE: Optional[JVMProfile] = None
+# Split the CPUs into PARALLEL_SIZE disjoint slots (NUMA aware) and pin every EPOS process to one of them (Linux only)
+# Matching -XX:ActiveProcessorCount, ParallelGCThreads and ConcGCThreads are passed unless set in JVM_PROFILE
+CPU_AFFINITY = False
+# How EPOS output is written to executor/<timestamp>/log
+# LogPolicy(mode="chunks", compression=None, max_size_mb=None): lines are parsed until the output dir is found, the rest is copied in 64KB chunks
+#   compression: None, "gzip" or "zstd" (requires zstandard), max_size_mb keeps the first and last half of larger logs
+# LogPolicy(mode="direct"): EPOS writes the log file itself, no copying in python
+LOG_POLICY = LogPolicy()
+# Properties of launched tasks are kept in executor/<timestamp>/properties/manifest.jsonl as diffs to the template
+# .properties files only exist while their task runs (failed ones are kept)
+# Manifest durability: "none" (left to the OS), "batch" (fsync every 256 tasks or 5 seconds) or "file" (fsync every task)
+PROPERTIES_DURABILITY = "batch"
+# journal.jsonl durability of completed tasks: "none", "batch" (fsync every 64 tasks or second) or "file" (fsync every task)
+# Tasks completed after the last fsync run again when a crashed executor is resumed
+JOURNAL_DURABILITY = "batch"
+# Adapt the running EPOS processes to measured throughput, memory and load, PARALLEL_SIZE becomes the ceiling
+ADAPTIVE_CONCURRENCY = False
+# Max total RSS of all running EPOS processes in MB, None for no limit (ADAPTIVE_CONCURRENCY only)
+MEMORY_LIMIT_MB: Optional[int] = None
+# System memory that must stay available in MB (ADAPTIVE_CONCURRENCY only)
+MEMORY_RESERVE_MB = 512
 
 CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
 # epos.py
@@ -24,12 +71,72 @@ CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
 WORKSPACE_PATH = os.path.join(CURRENT_DIR, "workspace")
 EPOS_PROPERTIES_TEMPLATE_PATH = os.path.join(WORKSPACE_PATH, "epos.template.properties")
 REPORT_PATH = os.path.join(CURRENT_DIR, "result.csv")
+# "csv": one row per task with modified values in one column
+# "sqlite": one typed and indexed column per param and report value, query it with query.py (use e.g. result.db as REPORT_PATH)
+REPORT_BACKEND = "csv"
+# Reports of runs with the same jar, dataset files and final properties are reused across sweeps
+# Set to None to always run EPOS
+RESULT_CACHE_PATH: Optional[str] = None  # os.path.join(WORKSPACE_PATH, "cache")
+# Cache size limit in MB, least recently used entries are evicted first
+RESULT_CACHE_SIZE_MB = 1024
+# Also cache EPOS output dirs, cached outputs are restored into executor/<timestamp>/cache
+RESULT_CACHE_KEEP_OUTPUT = False
+# Multi-node mode: epos.py --coordinator HOST:PORT on one box, epos.py --worker HOST:PORT on every box sharing the workspace image
+# A task is requeued when its worker disconnects or sends no heartbeat for COORDINATOR_LEASE_SECOND
+COORDINATOR_LEASE_SECOND = 60.0
+WORKER_HEARTBEAT_SECOND = 10.0
+# Send the required_outputs (every file if None) of reported tasks to executor/<timestamp>/outputs of the coordinator
+WORKER_STREAM_OUTPUTS = False
+# What is left of an EPOS output dir after its report is generated
+# RetentionPolicy(mode): "keep" everything, "keep_used" only required_outputs of the analyzer, "archive" into one .tar.gz or "delete"
+# keep_top=k keeps the full outputs of the best k results in every mode
+RETENTION = RetentionPolicy()
+# Serve live progress, throughput, ETA and per-JVM resource usage at http://127.0.0.1:METRICS_PORT/metrics (Prometheus) and /status (JSON)
+METRICS_PORT: Optional[int] = None  # 9464
+# Rewrite the JSON status to this file every METRICS_INTERVAL_SECOND
+METRICS_STATUS_PATH: Optional[str] = None  # os.path.join(CURRENT_DIR, "status.json")
+METRICS_INTERVAL_SECOND = 5.0
+# Collect the full per-iteration series of every reported task into one columnar dataset, None to disable
+# Parquet with pyarrow installed, otherwise NumPy .npz parts, read them with SeriesStore.read
+SERIES_PATH: Optional[str] = None  # os.path.join(CURRENT_DIR, "series")
+# Collected EPOSOutput files, their loggers must be enabled in the template
+SERIES_FILES = [
+    EPOSOutput.GLOBAL_COST_CSV_FILE,
+    EPOSOutput.UNFAIRNESS_CSV_FILE,
+    EPOSOutput.LOCAL_COST_CSV_FILE,
+    EPOSOutput.GLOBAL_RESPONSE_CSV_FILE,
+]
 
-# Dict[str, List[str]]
+# Dict[str, Union[List[str], ParamRange, Conditional]]
+# ParamRange(low, high, integer, precision) is a continuous range, only for samplers other than GridSampler
+# Conditional(values, when={property: allowed values}) or Conditional(values, condition=predicate) only varies when the condition holds,
+#   e.g. "periodically.reorganizationPeriod": Conditional([3, 5, 10], when={"strategy": "periodically"})
+#   otherwise the template value is used, combinations with equal properties run only once
 PARAMS = {
     "numChildren": [2, 4],
     "weightsString": generate_weights(0.3, (0.20, 0.25, 0.01), 2)
 }
+# Tasks are dropped before launch if any predicate returns False for their properties
+# e.g. lambda p: int(p["numChildren"]) < int(p["numAgents"])
+CONSTRAINTS: List[Callable[[Dict[str, Any]], bool]] = []
+# How tasks are picked from PARAMS
+# GridSampler(): every combination
+# RandomSampler(budget, seed), LatinHypercubeSampler(budget, seed), SobolSampler(budget, seed): a fixed amount of samples
+SAMPLER: AbstractSampler = GridSampler()
+# Check numAgents, numPlans and planDim of every task against its dataset, tasks that don't fit fail without starting EPOS
+# Dataset metadata is cached in workspace/dataset-catalog.json and only changed .plans files are parsed again
+DATASET_VALIDATION = True
+# Predict the wall time of every task from numAgents, numPlans, planDim, numIterations, numSimulations and numChildren
+# Longest expected tasks of the next TASK_LOOKAHEAD ones launch first and the task log shows a predicted ETA
+# Observed wall times are appended to this file and refine the model in later sweeps, None keeps the sampler order
+COST_MODEL_PATH: Optional[str] = None  # os.path.join(WORKSPACE_PATH, "cost-model.jsonl")
+TASK_LOOKAHEAD = 1024
+# Multi-fidelity search, None runs every sample at the template numIterations and numSimulations
+# Configs start at low numIterations / numSimulations and the best 1 / eta of them are promoted in rounds
+# e.g. SuccessiveHalvingSearch(SAMPLER, min_iterations=5, eta=3) or HyperbandSearch(SAMPLER, min_iterations=5, eta=3)
+SEARCH: Optional[SuccessiveHalvingSearch] = None
+# Kill a run whose global cost is still worse than the best result after this many iterations, None to disable
+PRUNE_AFTER_ITERATIONS: Optional[int] = None
 
 
 class MiniumGlobalCostAnalyzer(AbstractAnalyzer):
@@ -41,8 +148,20 @@ class MiniumGlobalCostAnalyzer(AbstractAnalyzer):
     def generate_report(self, output_dir: str) -> dict:
         return report_minium_global_cost(output_dir)
 
+    def required_outputs(self) -> Optional[List[str]]:
+        return [EPOSOutput.GLOBAL_COST_CSV_FILE]
+
     def best_result(self, reports: List[dict]) -> int:
         return reports.index(min(reports, key=lambda x: x["var"]))
 
+    def objectives(self) -> Optional[Dict[str, str]]:
+        return {"var": "min"}
+
+    def monitored_output(self) -> Optional[str]:
+        return EPOSOutput.GLOBAL_COST_CSV_FILE if PRUNE_AFTER_ITERATIONS is not None else None
+
+    def should_prune(self, rows: List[List[str]], best_report: Optional[dict]) -> bool:
+        return prune_by_global_cost(rows, best_report, PRUNE_AFTER_ITERATIONS)
+
 
 ANALYZER: AbstractAnalyzer = MiniumGlobalCostAnalyzer()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import time
 
@@ -12,22 +13,111 @@ from epos_runner.log import logger
 # os.putenv("EPOS_RUNNER_LOG_PATH", "epos-runner.log")
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Multiprocess parameter searcher for EPOS")
+    parser.add_argument("--clear-cache", action="store_true", help="Remove all cached reports and exit")
+    parser.add_argument("--resume", metavar="EXECUTOR_DIR", help="Continue an interrupted run, completed tasks are skipped")
+    parser.add_argument("--coordinator", metavar="HOST:PORT", help="Serve tasks to remote workers instead of running them")
+    parser.add_argument("--worker", metavar="HOST:PORT", help="Run tasks leased from a coordinator")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     logger.info("EPOS Runner V5.2 Ultra")
+    result_cache = None
+    if config.RESULT_CACHE_PATH is not None:
+        result_cache = ResultCache(config.RESULT_CACHE_PATH, config.RESULT_CACHE_SIZE_MB, config.RESULT_CACHE_KEEP_OUTPUT)
+    if args.clear_cache:
+        if result_cache is None:
+            raise ValueError("RESULT_CACHE_PATH is not set!")
+        logger.info(f"Clear {len(result_cache)} cached reports in {config.RESULT_CACHE_PATH}")
+        result_cache.clear()
+        return
     if config.PARALLEL_SIZE < 1:
         raise ValueError("EXECUTOR_AMOUNT must >= 1!")
     if len(config.PARAMS) <= 0:
         raise ValueError("No params available!")
     logger.info(f"Parallel size: {config.PARALLEL_SIZE}")
-    logger.info(f"Output CSV path: {config.REPORT_PATH}")
+    logger.info(f"Analysis parallel size: {config.ANALYSIS_PARALLEL_SIZE}")
+    logger.info(f"Report path: {config.REPORT_PATH} ({config.REPORT_BACKEND})")
+    logger.info(f"Result cache: {config.RESULT_CACHE_PATH}")
+    logger.info(f"Series path: {config.SERIES_PATH}")
+    logger.info(f"Sandbox mode: {config.SANDBOX_MODE}")
+    logger.info(f"Adaptive concurrency: {config.ADAPTIVE_CONCURRENCY}")
+    logger.info(f"CPU affinity: {config.CPU_AFFINITY}")
+    logger.info(f"Cost model: {config.COST_MODEL_PATH}")
+    logger.info(f"Dataset validation: {config.DATASET_VALIDATION}")
+    logger.info(f"Log policy: {config.LOG_POLICY}")
+    logger.info(f"Retention: {config.RETENTION}")
+    logger.info(f"Metrics: port {config.METRICS_PORT}, status {config.METRICS_STATUS_PATH}")
     if config.PRINT_PARAMS:
         Report.print_params(config.PARAMS)
     template = Properties.load_file(config.EPOS_PROPERTIES_TEMPLATE_PATH)
     logger.info("=" * 50)
     start_second = time.time()
-    executor = ParallerExecutor(config.WORKSPACE_PATH, config.REPORT_PATH, config.PARALLEL_SIZE, template, config.PARAMS, config.ANALYZER)
-    logger.info(f"Executor dir: {executor.executor_dir}")
-    reports = executor.run()
+    admission = AdmissionController(config.PARALLEL_SIZE, config.MEMORY_LIMIT_MB, config.MEMORY_RESERVE_MB) if config.ADAPTIVE_CONCURRENCY else None
+    affinity = CPUAffinity(config.PARALLEL_SIZE) if config.CPU_AFFINITY else None
+    dataset_catalog = None
+    if config.DATASET_VALIDATION:
+        dataset_catalog = DatasetCatalog(os.path.join(config.WORKSPACE_PATH, EPOSFolder.DATASETS_DIR),
+                                         os.path.join(config.WORKSPACE_PATH, "dataset-catalog.json"))
+    cost_model = CostModel(config.COST_MODEL_PATH) if config.COST_MODEL_PATH is not None else None
+    metrics = None
+    if config.METRICS_PORT is not None or config.METRICS_STATUS_PATH is not None:
+        metrics = LiveMetrics(config.METRICS_PORT, status_path=config.METRICS_STATUS_PATH, interval_second=config.METRICS_INTERVAL_SECOND)
+    if args.worker is not None:
+        host, port = parse_address(args.worker)
+        # Keep serving coordinators, e.g. every round of a SEARCH, until none shows up
+        while True:
+            worker = RemoteWorker(host, port, config.WORKSPACE_PATH, config.PARALLEL_SIZE, template, config.ANALYZER,
+                                  heartbeat_second=config.WORKER_HEARTBEAT_SECOND, stream_outputs=config.WORKER_STREAM_OUTPUTS,
+                                  sandbox=config.SANDBOX_MODE, jvm_profile=config.JVM_PROFILE, admission=admission, result_cache=result_cache,
+                                  analysis_size=config.ANALYSIS_PARALLEL_SIZE, log_policy=config.LOG_POLICY, retention=config.RETENTION,
+                                  metrics=metrics, affinity=affinity, cost_model=cost_model,
+                                  dataset_catalog=dataset_catalog, properties_durability=config.PROPERTIES_DURABILITY,
+                                  journal_durability=config.JOURNAL_DURABILITY,
+                                  top_k=config.TOP_K, max_front_size=config.PARETO_FRONT_SIZE, keep_reports=False)
+            try:
+                worker.run()
+            except OSError as e:
+                logger.info(f"No coordinator at {args.worker}: {e}")
+                break
+        logger.info(f"{os.linesep}Done")
+        return
+    series_store = SeriesStore(config.SERIES_PATH, config.SERIES_FILES) if config.SERIES_PATH is not None else None
+
+    def create_executor(sampler: AbstractSampler) -> ParallerExecutor:
+        executor_kwargs = dict(sandbox=config.SANDBOX_MODE, jvm_profile=config.JVM_PROFILE, admission=admission, result_cache=result_cache,
+                               resume_dir=args.resume, sampler=sampler,
+                               analysis_size=config.ANALYSIS_PARALLEL_SIZE, report_backend=config.REPORT_BACKEND,
+                               series_store=series_store, log_policy=config.LOG_POLICY,
+                               retention=config.RETENTION, metrics=metrics, affinity=affinity,
+                               cost_model=cost_model, task_lookahead=config.TASK_LOOKAHEAD, dataset_catalog=dataset_catalog,
+                               constraints=config.CONSTRAINTS, properties_durability=config.PROPERTIES_DURABILITY,
+                               journal_durability=config.JOURNAL_DURABILITY,
+                               top_k=config.TOP_K, max_front_size=config.PARETO_FRONT_SIZE,
+                               # A search ranks all reports of every round
+                               keep_reports=config.SEARCH is not None)
+        if args.coordinator is not None:
+            host, port = parse_address(args.coordinator)
+            executor = Coordinator(host, port, config.WORKSPACE_PATH, config.REPORT_PATH, config.PARALLEL_SIZE, template, config.PARAMS, config.ANALYZER,
+                                   lease_second=config.COORDINATOR_LEASE_SECOND, **executor_kwargs)
+        else:
+            executor = ParallerExecutor(config.WORKSPACE_PATH, config.REPORT_PATH, config.PARALLEL_SIZE, template, config.PARAMS, config.ANALYZER,
+                                        **executor_kwargs)
+        logger.info(f"Executor dir: {executor.executor_dir}")
+        if args.resume is not None:
+            logger.info(f"Resume report path: {executor.report_path}")
+        return executor
+
+    if config.SEARCH is not None:
+        if args.resume is not None:
+            raise ValueError("SEARCH can't be resumed!")
+        logger.info(f"Search: {config.SEARCH}")
+        reports = config.SEARCH.run(create_executor, template, config.PARAMS, config.ANALYZER, config.CONSTRAINTS)
+    else:
+        reports = create_executor(config.SAMPLER).run()
     end_second = time.time()
     logger.info("Time cost: %.2f minutes" % ((end_second - start_second) / 60))
     logger.info("=" * 50)
@@ -1,6 +1,23 @@
+from epos_runner.admission import AdmissionController
+from epos_runner.affinity import CPUAffinity
+from epos_runner.aggregator import StreamingAggregator
 from epos_runner.analyzer import AbstractAnalyzer
-from epos_runner.epos_files import EPOSOutput, EPOSFolder
+from epos_runner.cost_model import CostModel
+from epos_runner.dataset_catalog import DatasetCatalog
+from epos_runner.distributed import Coordinator, RemoteWorker, parse_address
+from epos_runner.epos_files import EPOSOutput, EPOSFolder, EPOSLogger
+from epos_runner.output_reader import EPOSOutputReader, EPOSTable
+from epos_runner.jvm import JVMProfile
+from epos_runner.log_pump import LogPolicy
+from epos_runner.metrics import LiveMetrics
 from epos_runner.paraller_executor import ParallerExecutor
 from epos_runner.properties import Properties
+from epos_runner.properties_store import PropertiesStore
 from epos_runner.report import Report
-from epos_runner.utils import generate_weights, report_minium_global_cost
+from epos_runner.retention import RetentionPolicy
+from epos_runner.result_cache import ResultCache
+from epos_runner.result_store import AbstractResultStore, CSVResultStore, SQLiteResultStore
+from epos_runner.series_store import SeriesStore
+from epos_runner.search import SuccessiveHalvingSearch, HyperbandSearch
+from epos_runner.sampler import AbstractSampler, Conditional, TaskFilter, ParamRange, GridSampler, RandomSampler, LatinHypercubeSampler, SobolSampler
+from epos_runner.utils import generate_weights, report_minium_global_cost, prune_by_global_cost
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from epos_runner import proc_stats
+from epos_runner.log import logger
+
+_MB = 1024 * 1024
+
+
+class _TaskUsage:
+    def __init__(self):
+        self.pid: Optional[int] = None
+        self.rss_bytes = 0
+        self.peak_rss_bytes = 0
+        self.cpu_seconds = 0.0
+        self.cpu_percent = 0.0
+
+
+class AdmissionController:
+    # Peak RSS of the last finished tasks used to estimate the next one
+    _PEAK_HISTORY_SIZE = 16
+
+    def __init__(self, max_concurrency: int,
+                 memory_limit_mb: Optional[int] = None,
+                 memory_reserve_mb: int = 512,
+                 initial_task_memory_mb: int = 512,
+                 sample_interval_second: float = 2.0,
+                 adjust_interval_second: float = 30.0):
+        if max_concurrency < 1:
+            raise ValueError("Max concurrency must >= 1!")
+        self.max_concurrency = max_concurrency
+        # Total RSS of all running EPOS processes
+        self.memory_limit_bytes = memory_limit_mb * _MB if memory_limit_mb is not None else None
+        # System memory that must stay available
+        self.memory_reserve_bytes = memory_reserve_mb * _MB
+        self.sample_interval_second = sample_interval_second
+        self.adjust_interval_second = adjust_interval_second
+        self.limit = min(max_concurrency, os.cpu_count() or 1)
+        self._initial_task_memory_bytes = initial_task_memory_mb * _MB
+        self._peak_history = deque(maxlen=AdmissionController._PEAK_HISTORY_SIZE)
+        self._tasks: Dict[int, _TaskUsage] = {}
+        self._next_slot = 0
+        self._memory_available_bytes: Optional[int] = None
+        self._load_average: Optional[float] = None
+        self._finished_in_window = 0
+        self._last_throughput: Optional[float] = None
+        self._direction = 1
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def running(self) -> int:
+        return len(self._tasks)
+
+    def task_memory_estimate(self) -> int:
+        peaks = [i.peak_rss_bytes for i in self._tasks.values()] + list(self._peak_history)
+        if len(self._peak_history) == 0:
+            peaks.append(self._initial_task_memory_bytes)
+        return max(peaks)
+
+    def _can_admit(self) -> bool:
+        if self.running == 0:
+            # Always keep one task running, otherwise the sweep can't make progress
+            return True
+        if self.running >= self.limit:
+            return False
+        estimate = self.task_memory_estimate()
+        # Running tasks may still grow up to the estimate
+        growth = sum(max(0, estimate - i.rss_bytes) for i in self._tasks.values())
+        if self.memory_limit_bytes is not None:
+            if sum(max(i.rss_bytes, estimate) for i in self._tasks.values()) + estimate > self.memory_limit_bytes:
+                return False
+        if self._memory_available_bytes is not None:
+            if self._memory_available_bytes - growth - estimate < self.memory_reserve_bytes:
+                return False
+        return True
+
+    # Must be called inside the event loop, return the sampler task
+    def start(self) -> asyncio.Task:
+        self._condition = asyncio.Condition()
+        if not proc_stats.is_available():
+            logger.warning("Can't read /proc, adaptive concurrency only follows throughput!")
+        return asyncio.ensure_future(self._sample_loop())
+
+    # Wait until a new task fits, return its slot
+    async def acquire(self) -> int:
+        async with self._condition:
+            await self._condition.wait_for(self._can_admit)
+            slot = self._next_slot
+            self._next_slot += 1
+            self._tasks[slot] = _TaskUsage()
+            return slot
+
+    def track(self, slot: int, pid: int):
+        self._tasks[slot].pid = pid
+
+    async def release(self, slot: int):
+        usage = self._tasks.pop(slot)
+        if usage.peak_rss_bytes > 0:
+            self._peak_history.append(usage.peak_rss_bytes)
+        self._finished_in_window += 1
+        async with self._condition:
+            self._condition.notify_all()
+
+    def _sample(self, interval_second: float):
+        self._memory_available_bytes = proc_stats.memory_available_bytes()
+        self._load_average = proc_stats.load_average()
+        for usage in self._tasks.values():
+            if usage.pid is None:
+                continue
+            rss_bytes = proc_stats.process_rss_bytes(usage.pid)
+            cpu_seconds = proc_stats.process_cpu_seconds(usage.pid)
+            if rss_bytes is not None:
+                usage.rss_bytes = rss_bytes
+                usage.peak_rss_bytes = max(usage.peak_rss_bytes, rss_bytes)
+            if cpu_seconds is not None:
+                usage.cpu_percent = (cpu_seconds - usage.cpu_seconds) / interval_second * 100
+                usage.cpu_seconds = cpu_seconds
+
+    # Hill climbing on finished tasks per minute, back off when the box is overloaded
+    def _adjust(self, window_second: float):
+        throughput = self._finished_in_window / window_second * 60
+        self._finished_in_window = 0
+        cpu_count = os.cpu_count() or 1
+        old_limit = self.limit
+        if self._load_average is not None and self._load_average > cpu_count * 1.5:
+            self._direction = -1
+        elif self._last_throughput is not None and throughput < self._last_throughput:
+            self._direction = -self._direction
+        self._last_throughput = throughput
+        self.limit = max(1, min(self.max_concurrency, self.limit + self._direction))
+        if self.limit != old_limit:
+            cpu_percent = sum(i.cpu_percent for i in self._tasks.values())
+            available = "%.0fMB" % (self._memory_available_bytes / _MB) if self._memory_available_bytes is not None else "unknown"
+            logger.info(f"Concurrency limit: {old_limit} -> {self.limit} "
+                        f"(%.2f tasks/min, load {self._load_average}, available {available}, JVM CPU %.0f%%)" % (throughput, cpu_percent))
+
+    async def _sample_loop(self):
+        last_adjust_time = time.time()
+        while True:
+            await asyncio.sleep(self.sample_interval_second)
+            self._sample(self.sample_interval_second)
+            now = time.time()
+            if now - last_adjust_time >= self.adjust_interval_second:
+                self._adjust(now - last_adjust_time)
+                last_adjust_time = now
+            async with self._condition:
+                self._condition.notify_all()
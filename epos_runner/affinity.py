@@ -0,0 +1,123 @@
+import glob
+import os
+from typing import Dict, List, Optional, Tuple
+
+from epos_runner.log import logger
+
+_SYS_CPU_PATH = "/sys/devices/system/cpu"
+_SYS_NODE_PATH = "/sys/devices/system/node"
+
+
+# "0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11]
+def parse_cpu_list(text: str) -> List[int]:
+    result = []
+    for part in text.strip().split(","):
+        part = part.strip()
+        if part == "":
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            result.extend(range(int(start), int(end) + 1))
+        else:
+            result.append(int(part))
+    return result
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+# {cpu: NUMA node}, empty without NUMA information
+def numa_nodes() -> Dict[int, int]:
+    result = {}
+    for node_path in glob.glob(os.path.join(_SYS_NODE_PATH, "node[0-9]*")):
+        try:
+            with open(os.path.join(node_path, "cpulist"), "r") as f:
+                cpus = parse_cpu_list(f.read())
+        except (OSError, ValueError):
+            continue
+        node = int(os.path.basename(node_path)[len("node"):])
+        for cpu in cpus:
+            result[cpu] = node
+    return result
+
+
+# Sort key keeping NUMA nodes, sockets and hyper-thread siblings of one core next to each other
+def _topology_key(cpu: int, nodes: Dict[int, int]) -> Tuple[int, int, int, int]:
+    topology_path = os.path.join(_SYS_CPU_PATH, f"cpu{cpu}", "topology")
+    package = _read_int(os.path.join(topology_path, "physical_package_id"))
+    core = _read_int(os.path.join(topology_path, "core_id"))
+    return nodes.get(cpu, 0), package if package is not None else 0, core if core is not None else cpu, cpu
+
+
+class CPUAffinity:
+    # Split the CPUs this process may use into slot_amount disjoint slots, one running EPOS process per slot
+    # Slots never cross a NUMA node when every node holds a whole number of slots
+    # jvm_flags passes -XX:ActiveProcessorCount and GC thread counts matching the slot size
+    def __init__(self, slot_amount: int, jvm_flags: bool = True, cpus: Optional[List[int]] = None):
+        if slot_amount < 1:
+            raise ValueError("Slot amount must >= 1!")
+        if not hasattr(os, "sched_setaffinity"):
+            raise ValueError("CPU affinity is not supported on this platform!")
+        self.jvm_flags = jvm_flags
+        if cpus is None:
+            cpus = sorted(os.sched_getaffinity(0))
+        nodes = numa_nodes()
+        self.numa_node_amount = len(set(nodes[i] for i in cpus if i in nodes))
+        ordered = sorted(cpus, key=lambda i: _topology_key(i, nodes))
+        self.slots = CPUAffinity._split(ordered, slot_amount)
+        if len(cpus) < slot_amount:
+            logger.warning(f"Only {len(cpus)} CPUs for {slot_amount} slots, slots share CPUs!")
+        self._free_slots = list(range(len(self.slots)))
+
+    # Contiguous chunks of sizes differing by at most one, CPUs are reused when there are less CPUs than slots
+    @staticmethod
+    def _split(cpus: List[int], slot_amount: int) -> List[List[int]]:
+        if len(cpus) < slot_amount:
+            return [[cpus[i % len(cpus)]] for i in range(slot_amount)]
+        size, remainder = divmod(len(cpus), slot_amount)
+        result = []
+        start = 0
+        for i in range(slot_amount):
+            end = start + size + (1 if i < remainder else 0)
+            result.append(cpus[start:end])
+            start = end
+        return result
+
+    # Every worker runs at most one EPOS process, so a slot is always free for it
+    def acquire(self) -> int:
+        if len(self._free_slots) == 0:
+            raise RuntimeError("No free CPU slot!")
+        return self._free_slots.pop(0)
+
+    def release(self, slot: int):
+        self._free_slots.append(slot)
+
+    def cpus(self, slot: int) -> List[int]:
+        return self.slots[slot]
+
+    # Skipped if the same flag is already set by the JVM profile
+    def options(self, slot: int, existing_options: List[str]) -> List[str]:
+        if not self.jvm_flags:
+            return []
+        size = len(self.slots[slot])
+        flags = {
+            "-XX:ActiveProcessorCount=": size,
+            "-XX:ParallelGCThreads=": size,
+            "-XX:ConcGCThreads=": max(1, (size + 3) // 4),
+        }
+        return [f"{flag}{value}" for flag, value in flags.items() if not any(i.startswith(flag) for i in existing_options)]
+
+    # Used as preexec_fn, runs in the forked child before exec
+    def pin(self, slot: int):
+        cpus = set(self.slots[slot])
+        return lambda: os.sched_setaffinity(0, cpus)
+
+    def __str__(self) -> str:
+        sizes = sorted(set(len(i) for i in self.slots))
+        size_text = "/".join(str(i) for i in sizes)
+        return f"{len(self.slots)} slots of {size_text} CPUs over {max(self.numa_node_amount, 1)} NUMA nodes, JVM flags: {self.jvm_flags}"
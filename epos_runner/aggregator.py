@@ -0,0 +1,116 @@
+import heapq
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from epos_runner.analyzer import AbstractAnalyzer
+
+
+class StreamingAggregator:
+    DIRECTIONS = ("min", "max")
+
+    # Summary of all reports in constant memory: running best, top_k reports of every objective
+    # and the Pareto front over the objectives declared by the analyzer, thinned to max_front_size
+    def __init__(self, analyzer: AbstractAnalyzer, top_k: int = 10, max_front_size: int = 256):
+        if top_k < 1:
+            raise ValueError("Top k must >= 1!")
+        if max_front_size < 2:
+            raise ValueError("Max front size must >= 2!")
+        self.analyzer = analyzer
+        self.top_k = top_k
+        self.max_front_size = max_front_size
+        self.objectives: Dict[str, str] = dict(analyzer.objectives() or {})
+        for key, direction in self.objectives.items():
+            if direction not in StreamingAggregator.DIRECTIONS:
+                raise ValueError(f"Direction of objective '{key}' must be one of {StreamingAggregator.DIRECTIONS}! {direction}")
+        self.report_amount = 0
+        self.best: Optional[dict] = None
+        # {objective: min heap of (-score, number, bundled report)}, the worst kept report is on top
+        self._tops: Dict[str, List[Tuple[float, int, dict]]] = {key: [] for key in self.objectives}
+        # [(scores, bundled report)], no report dominates another one
+        self._front: List[Tuple[Tuple[float, ...], dict]] = []
+
+    # Smaller is better for every score, None if a value is missing or not a number
+    def _scores(self, report: dict) -> Optional[Tuple[float, ...]]:
+        result = []
+        for key, direction in self.objectives.items():
+            try:
+                value = float(report[key])
+            except (KeyError, TypeError, ValueError):
+                return None
+            if math.isnan(value):
+                return None
+            result.append(value if direction == "min" else -value)
+        return tuple(result)
+
+    @staticmethod
+    def _dominates(a: Tuple[float, ...], b: Tuple[float, ...]) -> bool:
+        return all(x <= y for x, y in zip(a, b)) and a != b
+
+    def add(self, bundled_report: dict):
+        self.report_amount += 1
+        if self.best is None or self.analyzer.best_result([self.best["report"], bundled_report["report"]]) == 1:
+            self.best = bundled_report
+        scores = self._scores(bundled_report["report"])
+        if scores is None:
+            return
+        for i, key in enumerate(self.objectives):
+            item = (-scores[i], self.report_amount, bundled_report)
+            if len(self._tops[key]) < self.top_k:
+                heapq.heappush(self._tops[key], item)
+            elif item[0] > self._tops[key][0][0]:
+                heapq.heapreplace(self._tops[key], item)
+        self._add_to_front(scores, bundled_report)
+
+    def _add_to_front(self, scores: Tuple[float, ...], bundled_report: dict):
+        for front_scores, _ in self._front:
+            if front_scores == scores or StreamingAggregator._dominates(front_scores, scores):
+                return
+        self._front = [i for i in self._front if not StreamingAggregator._dominates(scores, i[0])]
+        self._front.append((scores, bundled_report))
+        if len(self._front) > self.max_front_size:
+            self._thin_front()
+
+    # Drop the most crowded report, the extremes of every objective are always kept
+    def _thin_front(self):
+        distances = [0.0] * len(self._front)
+        for i in range(len(self.objectives)):
+            order = sorted(range(len(self._front)), key=lambda j: self._front[j][0][i])
+            low, high = self._front[order[0]][0][i], self._front[order[-1]][0][i]
+            distances[order[0]] = distances[order[-1]] = math.inf
+            if high == low:
+                continue
+            for k in range(1, len(order) - 1):
+                distances[order[k]] += (self._front[order[k + 1]][0][i] - self._front[order[k - 1]][0][i]) / (high - low)
+        del self._front[distances.index(min(distances))]
+
+    # Bundled reports sorted from best to worst objective value
+    def top(self, objective: str) -> List[dict]:
+        return [i[2] for i in sorted(self._tops[objective], key=lambda i: (-i[0], i[1]))]
+
+    # Bundled reports sorted by the first objective
+    def front(self) -> List[dict]:
+        return [i[1] for i in sorted(self._front, key=lambda i: i[0])]
+
+    # Best, top and front reports without duplicates, in place of all reports once they aren't kept
+    def reports(self) -> List[dict]:
+        result = []
+        seen = set()
+        candidates = ([self.best] if self.best is not None else []) + [i for key in self.objectives for i in self.top(key)] + self.front()
+        for bundled_report in candidates:
+            if id(bundled_report) not in seen:
+                seen.add(id(bundled_report))
+                result.append(bundled_report)
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "reports": self.report_amount,
+            "objectives": dict(self.objectives),
+            "best": self.best,
+            "top": {key: self.top(key) for key in self.objectives},
+            "pareto_front": self.front(),
+        }
+
+    def __str__(self) -> str:
+        objectives = ", ".join(f"{direction} {key}" for key, direction in self.objectives.items())
+        return f"{self.report_amount} reports, objectives: {objectives if objectives != '' else '-'}, front: {len(self._front)}"
@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 
 class AbstractAnalyzer:
@@ -17,3 +17,36 @@ class AbstractAnalyzer:
     @abstractmethod
     def best_result(self, reports: List[dict]) -> int:
         pass
+
+    # EPOSOutput files read by generate_report, loggers of all other files are disabled
+    # None keeps the loggers of the template
+    def required_outputs(self) -> Optional[List[str]]:
+        return None
+
+    # EPOSOutput file tailed while EPOS is running, None disables pruning
+    def monitored_output(self) -> Optional[str]:
+        return None
+
+    # Called with all rows (without header) of the monitored output read so far
+    # best_report is the best report until now or None, return True to kill the run early
+    def should_prune(self, rows: List[List[str]], best_report: Optional[dict]) -> bool:
+        return False
+
+    # Return indexes of the best reports in order, override it if reports can be sorted directly
+    def top_results(self, reports: List[dict], amount: int) -> List[int]:
+        indexes = list(range(len(reports)))
+        result = []
+        while len(indexes) > 0 and len(result) < amount:
+            best = indexes[self.best_result([reports[i] for i in indexes])]
+            indexes.remove(best)
+            result.append(best)
+        return result
+
+    # {report key: "min" or "max"} optimized together, the Pareto front of the sweep is kept over them
+    # None only keeps the best report of best_result
+    def objectives(self) -> Optional[Dict[str, str]]:
+        return None
+
+    # Change it to invalidate cached reports after the analysis changed
+    def cache_version(self) -> str:
+        return "1"
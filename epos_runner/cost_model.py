@@ -0,0 +1,139 @@
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from epos_runner.log import logger
+
+
+# Least squares with a ridge prior, solved by gaussian elimination with partial pivoting
+def _solve(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    size = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(size)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda i: abs(rows[i][column]))
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        if abs(rows[column][column]) < 1e-12:
+            continue
+        for i in range(column + 1, size):
+            factor = rows[i][column] / rows[column][column]
+            for j in range(column, size + 1):
+                rows[i][j] -= factor * rows[column][j]
+    result = [0.0] * size
+    for i in reversed(range(size)):
+        if abs(rows[i][i]) < 1e-12:
+            continue
+        result[i] = (rows[i][size] - sum(rows[i][j] * result[j] for j in range(i + 1, size))) / rows[i][i]
+    return result
+
+
+class CostModel:
+    # log(wall second) = intercept + sum(exponent * log(property))
+    FEATURES = ("numAgents", "numPlans", "planDim", "numIterations", "numSimulations", "numChildren")
+    # Before any observation, runtime grows linearly with the plans every agent checks in every iteration of every simulation
+    _PRIOR_EXPONENTS = (1.0, 1.0, 1.0, 1.0, 1.0, 0.0)
+    # Weight of the prior exponents, the intercept is left to the observations
+    _PRIOR_STRENGTH = 1.0
+    _INTERCEPT_PRIOR_STRENGTH = 1e-6
+
+    # Observed wall times are appended to path (json lines) and reloaded by the next sweep, None keeps them in memory
+    # min_observations: predictions are only relative (good for ordering, not for ETA) until this many runs were seen
+    def __init__(self, path: Optional[str] = None, max_observations: int = 10000, min_observations: int = 3):
+        if max_observations < 1:
+            raise ValueError("Max observations must >= 1!")
+        self.path = path
+        self.max_observations = max_observations
+        self.min_observations = min_observations
+        size = len(CostModel.FEATURES) + 1
+        self._observations: Deque[Tuple[List[float], float]] = deque()
+        self._xtx = [[0.0] * size for _ in range(size)]
+        self._xty = [0.0] * size
+        self._weights = [0.0] + list(CostModel._PRIOR_EXPONENTS)
+        if path is not None and os.path.isfile(path):
+            self._load(path)
+
+    @property
+    def observation_amount(self) -> int:
+        return len(self._observations)
+
+    # True once predictions are in seconds
+    @property
+    def calibrated(self) -> bool:
+        return len(self._observations) >= self.min_observations
+
+    @staticmethod
+    def _features(properties: Dict[str, Any]) -> List[float]:
+        result = [1.0]
+        for name in CostModel.FEATURES:
+            try:
+                value = float(str(properties.get(name, 1)).strip().strip("\"'"))
+            except ValueError:
+                value = 1.0
+            result.append(math.log(max(value, 1.0)))
+        return result
+
+    def predict(self, properties: Dict[str, Any]) -> float:
+        features = CostModel._features(properties)
+        return math.exp(min(sum(w * x for w, x in zip(self._weights, features)), 700))
+
+    def observe(self, properties: Dict[str, Any], wall_second: float):
+        if wall_second <= 0:
+            return
+        features = CostModel._features(properties)
+        self._add(features, wall_second)
+        self._fit()
+        if self.path is not None:
+            record = {
+                "time": time.time(),
+                "features": {name: math.exp(x) for name, x in zip(CostModel.FEATURES, features[1:])},
+                "wall_second": wall_second,
+            }
+            try:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                logger.warning(f"Cost model observation can't be saved! {e}")
+
+    def _add(self, features: List[float], wall_second: float):
+        self._observations.append((features, wall_second))
+        self._accumulate(features, math.log(wall_second), 1)
+        if len(self._observations) > self.max_observations:
+            old_features, old_wall_second = self._observations.popleft()
+            self._accumulate(old_features, math.log(old_wall_second), -1)
+
+    def _accumulate(self, features: List[float], target: float, sign: int):
+        for i, x_i in enumerate(features):
+            self._xty[i] += sign * x_i * target
+            for j, x_j in enumerate(features):
+                self._xtx[i][j] += sign * x_i * x_j
+
+    def _fit(self):
+        prior = [0.0] + list(CostModel._PRIOR_EXPONENTS)
+        strengths = [CostModel._INTERCEPT_PRIOR_STRENGTH] + [CostModel._PRIOR_STRENGTH] * len(CostModel.FEATURES)
+        matrix = [list(row) for row in self._xtx]
+        vector = list(self._xty)
+        for i in range(len(vector)):
+            matrix[i][i] += strengths[i]
+            vector[i] += strengths[i] * prior[i]
+        self._weights = _solve(matrix, vector)
+
+    def _load(self, path: str):
+        with open(path, "r") as f:
+            lines = deque(f, maxlen=self.max_observations)
+        for line in lines:
+            try:
+                record = json.loads(line)
+                features = CostModel._features(record["features"])
+                wall_second = float(record["wall_second"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            if wall_second > 0:
+                self._add(features, wall_second)
+        if len(self._observations) > 0:
+            self._fit()
+
+    def __str__(self) -> str:
+        exponents = ", ".join(f"{name}^{weight:.2f}" for name, weight in zip(CostModel.FEATURES, self._weights[1:]))
+        return f"{len(self._observations)} observations, wall ~ {math.exp(self._weights[0]):.3g}s * {exponents}"
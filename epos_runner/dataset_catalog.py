@@ -0,0 +1,153 @@
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from epos_runner.log import logger
+
+_AGENT_FILE_PATTERN = re.compile(r"^agent_(\d+)\.plans$")
+_CHUNK_SIZE = 1024 * 1024
+
+
+class PlansFileInfo:
+    def __init__(self, plans: int, dim: Optional[int]):
+        self.plans = plans
+        # None if lines have different dimensions
+        self.dim = dim
+
+    # Lines are "<cost>:<v1>,<v2>,...", counted in chunks without splitting lines
+    @staticmethod
+    def scan(file_path: str) -> "PlansFileInfo":
+        lines = 0
+        commas = 0
+        first_line = b""
+        last_byte = b"\n"
+        with open(file_path, "rb") as f:
+            while True:
+                chunk = f.read(_CHUNK_SIZE)
+                if len(chunk) == 0:
+                    break
+                if lines == 0:
+                    first_line += chunk.split(b"\n", 1)[0]
+                lines += chunk.count(b"\n")
+                commas += chunk.count(b",")
+                last_byte = chunk[-1:]
+        if last_byte != b"\n":
+            lines += 1
+        if lines == 0 or first_line.strip() == b"":
+            return PlansFileInfo(0, None)
+        dim = first_line.count(b",") + 1
+        return PlansFileInfo(lines, dim if commas == lines * (dim - 1) else None)
+
+
+class DatasetInfo:
+    def __init__(self, name: str, plan_counts: List[int], dims: List[Optional[int]]):
+        self.name = name
+        # Indexed by agent number, agents are contiguous from agent_0
+        self.plan_counts = plan_counts
+        self.dims = dims
+
+    @property
+    def agents(self) -> int:
+        return len(self.plan_counts)
+
+    # Error message or None if EPOS can run numAgents, numPlans and planDim on this dataset
+    def check(self, num_agents: int, num_plans: int, plan_dim: int) -> Optional[str]:
+        if num_agents <= 0:
+            return f"numAgents must > 0! {num_agents}"
+        if num_agents > self.agents:
+            return f"numAgents {num_agents} > {self.agents} agents in dataset '{self.name}'"
+        min_plans = min(self.plan_counts[:num_agents])
+        if num_plans > min_plans:
+            agent = self.plan_counts.index(min_plans)
+            return f"numPlans {num_plans} > {min_plans} plans of agent_{agent} in dataset '{self.name}'"
+        for agent, dim in enumerate(self.dims[:num_agents]):
+            if dim is None:
+                return f"agent_{agent} of dataset '{self.name}' has plans of different dimensions"
+            if dim != plan_dim:
+                return f"planDim {plan_dim} != {dim} of agent_{agent} in dataset '{self.name}'"
+        return None
+
+    def __str__(self) -> str:
+        plans = f"{min(self.plan_counts)}-{max(self.plan_counts)}" if self.agents > 0 else "0"
+        dims = sorted(set(str(i) for i in self.dims))
+        return f"{self.name}: {self.agents} agents, {plans} plans, dim {'/'.join(dims) if len(dims) > 0 else '-'}"
+
+
+class DatasetCatalog:
+    # Parsed .plans files are cached in cache_path keyed by mtime and size, only changed files are scanned again
+    def __init__(self, datasets_dir: str, cache_path: Optional[str] = None):
+        self.datasets_dir = datasets_dir
+        self.cache_path = cache_path
+        # {dataset: {file name: [mtime_ns, size, plans, dim]}}
+        self._cache: Dict[str, Dict[str, list]] = {}
+        self._datasets: Dict[str, Optional[DatasetInfo]] = {}
+        if cache_path is not None and os.path.isfile(cache_path):
+            try:
+                with open(cache_path, "r") as f:
+                    self._cache = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dataset catalog cache can't be read! {e}")
+
+    # None if the dataset folder doesn't exist, every dataset is scanned once per catalog
+    def get(self, name: str) -> Optional[DatasetInfo]:
+        if name not in self._datasets:
+            self._datasets[name] = self._scan(name)
+        return self._datasets[name]
+
+    def _scan(self, name: str) -> Optional[DatasetInfo]:
+        dataset_path = os.path.join(self.datasets_dir, name)
+        if name == "" or not os.path.isdir(dataset_path):
+            return None
+        cached = self._cache.get(name, {})
+        files = {}
+        agents = {}
+        changed = False
+        for entry in os.scandir(dataset_path):
+            match = _AGENT_FILE_PATTERN.match(entry.name)
+            if match is None or not entry.is_file():
+                continue
+            stat = entry.stat()
+            record = cached.get(entry.name)
+            if record is None or record[0] != stat.st_mtime_ns or record[1] != stat.st_size:
+                info = PlansFileInfo.scan(entry.path)
+                record = [stat.st_mtime_ns, stat.st_size, info.plans, info.dim]
+                changed = True
+            files[entry.name] = record
+            agents[int(match.group(1))] = record
+        if changed or len(files) != len(cached):
+            self._cache[name] = files
+            self._save()
+        agent_amount = 0
+        while agent_amount in agents:
+            agent_amount += 1
+        return DatasetInfo(name, [agents[i][2] for i in range(agent_amount)], [agents[i][3] for i in range(agent_amount)])
+
+    def _save(self):
+        if self.cache_path is None:
+            return
+        temp_path = self.cache_path + ".tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(self._cache, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Dataset catalog cache can't be saved! {e}")
+
+    @staticmethod
+    def _int_property(properties: Dict[str, Any], key: str) -> Optional[int]:
+        try:
+            return int(str(properties[key]).strip().strip("\"'"))
+        except (KeyError, ValueError):
+            return None
+
+    # Error message or None if the task can run, properties without dataset keys are left to EPOS
+    def validate(self, properties: Dict[str, Any]) -> Optional[str]:
+        name = str(properties.get("dataset", "")).strip().strip("\"'")
+        info = self.get(name)
+        if info is None:
+            return f"Dataset '{name}' can't be found in '{self.datasets_dir}'"
+        values = [DatasetCatalog._int_property(properties, i) for i in ("numAgents", "numPlans", "planDim")]
+        if None in values:
+            return None
+        return info.check(*values)
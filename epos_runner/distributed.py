@@ -0,0 +1,401 @@
+import asyncio
+import io
+import json
+import os
+import socket
+import tarfile
+import time
+from collections import deque
+from typing import Dict, List, Tuple, Any, Optional, Deque, Set
+
+from epos_runner.analyzer import AbstractAnalyzer
+from epos_runner.epos_files import EPOSOutput
+from epos_runner.journal import TaskState
+from epos_runner.log import logger
+from epos_runner.paraller_executor import ParallerExecutor
+from epos_runner.result_store import AbstractResultStore
+from epos_runner.sampler import ListSampler
+
+# JSON lines, a message with "payload_size" is followed by that many raw bytes
+_STREAM_LIMIT = 16 * 1024 * 1024
+
+Task = Tuple[int, Dict[str, Any], dict]
+
+
+async def _read_message(reader: asyncio.StreamReader) -> Optional[Tuple[dict, bytes]]:
+    try:
+        line = await reader.readline()
+        if line == b"":
+            return None
+        message = json.loads(line)
+        payload = b""
+        if message.get("payload_size", 0) > 0:
+            payload = await reader.readexactly(message["payload_size"])
+        return message, payload
+    except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+        # Connection closed in the middle of a message
+        return None
+
+
+def _write_message(writer: asyncio.StreamWriter, message: dict, payload: bytes = b""):
+    if len(payload) > 0:
+        message = dict(message, payload_size=len(payload))
+    writer.write(json.dumps(message, default=str).encode() + b"\n")
+    if len(payload) > 0:
+        writer.write(payload)
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    if ":" not in address:
+        raise ValueError(f"Address must be HOST:PORT! {address}")
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+# Return a tar.gz of the used files of an output dir, used_files=None packs every file
+def pack_outputs(output_dir: str, used_files: Optional[List[str]]) -> bytes:
+    if used_files is None:
+        file_names = sorted(os.listdir(output_dir))
+    else:
+        file_names = list(used_files) + [EPOSOutput.USED_CONF_TXT_FILE]
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz", compresslevel=6) as tar:
+        for file_name in file_names:
+            file_path = os.path.join(output_dir, file_name)
+            if os.path.isfile(file_path):
+                tar.add(file_path, arcname=file_name)
+    return buffer.getvalue()
+
+
+# Only regular files are extracted and their paths are flattened, so a payload can't write outside output_dir
+def unpack_outputs(payload: bytes, output_dir: str):
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    with tarfile.open(fileobj=io.BytesIO(payload), mode="r:gz") as tar:
+        for member in tar.getmembers():
+            if not member.isfile():
+                continue
+            with tar.extractfile(member) as source, open(os.path.join(output_dir, os.path.basename(member.name)), "wb") as target:
+                target.write(source.read())
+
+
+class Coordinator(ParallerExecutor):
+    OUTPUTS_DIR = "outputs"
+    _WAIT_SECOND = 1.0
+
+    # Holds the task queue, journal and report, remote workers lease tasks over TCP
+    # A lease expires without heartbeat for lease_second, tasks of expired leases and lost workers are requeued
+    def __init__(self, host: str, port: int, workspace_dir: str, report_path: str, parallel_size: int, template: Dict[str, Any],
+                 params: Dict[str, List[Any]], analyzer: AbstractAnalyzer, lease_second: float = 60.0, **kwargs):
+        super().__init__(workspace_dir, report_path, parallel_size, template, params, analyzer, **kwargs)
+        if lease_second <= 0:
+            raise ValueError("Lease second must > 0!")
+        self.host = host
+        self.port = port
+        self.lease_second = lease_second
+        # {task number: (worker, deadline, task)}
+        self._leases: Dict[int, Tuple[str, float, Task]] = {}
+        self._requeued: Deque[Task] = deque()
+        self._tasks_exhausted = False
+        self._finished: Optional[asyncio.Event] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._handlers: Set[asyncio.Future] = set()
+        self._connection_counter = 0
+        self._bundled_reports: List[dict] = []
+
+    def _check_finished(self):
+        if self._tasks_exhausted and len(self._requeued) == 0 and len(self._leases) == 0:
+            self._finished.set()
+
+    def _lease(self, worker: str) -> dict:
+        if len(self._requeued) > 0:
+            task = self._requeued.popleft()
+        elif not self._tasks_exhausted:
+            task = next(self._tasks, None)
+            self._tasks_exhausted = task is None
+        else:
+            task = None
+        if task is None:
+            self._check_finished()
+            return {"type": "done"} if self._finished.is_set() else {"type": "wait", "second": Coordinator._WAIT_SECOND}
+        task_number, properties, modified_values = task
+        self._leases[task_number] = (worker, time.time() + self.lease_second, task)
+        self.journal.record(task_number, TaskState.QUEUED, worker=worker)
+        return {"type": "task", "task": task_number, "properties": properties, "modified": modified_values, "best_report": self._best_report}
+
+    def _renew(self, worker: str):
+        deadline = time.time() + self.lease_second
+        for task_number, (lease_worker, _, task) in list(self._leases.items()):
+            if lease_worker == worker:
+                self._leases[task_number] = (lease_worker, deadline, task)
+
+    def _requeue(self, task_number: int):
+        _, _, task = self._leases.pop(task_number)
+        self._requeued.append(task)
+
+    async def _expire_leases(self):
+        while True:
+            await asyncio.sleep(min(self.lease_second / 4, 5.0))
+            now = time.time()
+            for task_number, (worker, deadline, _) in list(self._leases.items()):
+                if deadline < now:
+                    logger.warning(f"Lease of task {task_number} on {worker} expired, requeued")
+                    self._requeue(task_number)
+
+    def _complete(self, worker: str, message: dict, payload: bytes):
+        task_number = message["task"]
+        lease = self._leases.get(task_number)
+        if lease is not None and lease[0] == worker:
+            del self._leases[task_number]
+        else:
+            # Lease expired, but the task wasn't leased again yet
+            requeued = [i for i in self._requeued if i[0] == task_number]
+            if len(requeued) == 0:
+                logger.warning(f"Ignore stale result of task {task_number} from {worker}")
+                return
+            self._requeued.remove(requeued[0])
+        state = message["state"]
+        values = message.get("values", {})
+        self._task_counter += 1
+        if state == TaskState.REPORTED:
+            bundled_report = values["bundled_report"]
+            if len(payload) > 0:
+                output_dir = os.path.join(self.executor_dir, Coordinator.OUTPUTS_DIR, str(task_number))
+                unpack_outputs(payload, output_dir)
+                bundled_report["output"] = os.path.relpath(output_dir, self.executor_dir)
+            self.result_store.append(self._run_name, task_number, bundled_report)
+            if self.keep_reports:
+                self._bundled_reports.append(bundled_report)
+            self._update_best_report(bundled_report["report"])
+            self.aggregator.add(bundled_report)
+            if values.get("cached", False):
+                self._cached_task_counter += 1
+        elif state == TaskState.FAILED:
+            self._failed_task_counter += 1
+        elif state == TaskState.PRUNED:
+            self._pruned_task_counter += 1
+        self.journal.record(task_number, state, worker=worker, **values)
+        self._count_completed(state, values)
+        logger.info(f"Task: {self._progress()} {state} by {worker}")
+        self._check_finished()
+
+    async def _serve_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connection_counter += 1
+        connection_number = self._connection_counter
+        worker = f"worker#{connection_number}"
+        self._writers.add(writer)
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                received = await _read_message(reader)
+                if received is None:
+                    break
+                message, payload = received
+                if message["type"] == "hello":
+                    worker = f"{message['worker']}#{connection_number}"
+                    logger.info(f"Worker connected: {worker}")
+                elif message["type"] == "lease":
+                    _write_message(writer, dict(self._lease(worker), id=message["id"]))
+                    await writer.drain()
+                elif message["type"] == "heartbeat":
+                    self._renew(worker)
+                elif message["type"] == "complete":
+                    self._complete(worker, message, payload)
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+            lost_tasks = [task_number for task_number, (lease_worker, _, _) in self._leases.items() if lease_worker == worker]
+            for task_number in lost_tasks:
+                self._requeue(task_number)
+            if len(lost_tasks) > 0:
+                logger.warning(f"Worker lost: {worker}, {len(lost_tasks)} tasks requeued")
+            else:
+                logger.info(f"Worker disconnected: {worker}")
+
+    async def _run(self) -> List[dict]:
+        self._tasks = self._order_tasks(self._generate_tasks())
+        self._finished = asyncio.Event()
+        # Reports of a resumed executor dir
+        self._bundled_reports = [i[1] for i in self.journal.reports()] if self.keep_reports else []
+        self.result_store = self._open_result_store()
+        logger.info(f"Sampler: {self.sampler}")
+        logger.info(f"Total tasks: {self._total_text()}")
+        if self._task_counter > 0:
+            logger.info(f"Resumed tasks: {self._task_counter} completed")
+        server = await asyncio.start_server(self._serve_worker, self.host, self.port, limit=_STREAM_LIMIT)
+        logger.info(f"Coordinator listening on {self.host}:{self.port}")
+        expire_task = asyncio.ensure_future(self._expire_leases())
+        if self.metrics is not None:
+            await self.metrics.start(self._total_tasks_amount, self._task_counter, summary=self.aggregator.summary)
+        try:
+            await self._finished.wait()
+        finally:
+            expire_task.cancel()
+            if self.metrics is not None:
+                await self.metrics.stop()
+            server.close()
+            # Workers see the closed connection as done
+            for writer in list(self._writers):
+                writer.close()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await server.wait_closed()
+            self.journal.close()
+            self.properties_store.close()
+            self.result_store.close()
+        if self._failed_task_counter > 0:
+            logger.warning(f"{self._failed_task_counter} tasks failed!")
+        if self._pruned_task_counter > 0:
+            logger.info(f"{self._pruned_task_counter} tasks pruned")
+        if self._cached_task_counter > 0:
+            logger.info(f"Cached tasks: {self._cached_task_counter}")
+        self._write_summary()
+        logger.info(f"All tasks executed!")
+        return self._bundled_reports if self.keep_reports else self.aggregator.reports()
+
+
+class CoordinatorClient:
+    def __init__(self, host: str, port: int, name: str):
+        self.host = host
+        self.port = port
+        self.name = name
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._request_counter = 0
+        self._reply_task: Optional[asyncio.Future] = None
+        self.closed = False
+
+    # Retry until the coordinator is up, it may still be starting or between search rounds
+    async def connect(self, timeout_second: float):
+        deadline = time.time() + timeout_second
+        self._write_lock = asyncio.Lock()
+        while True:
+            try:
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=_STREAM_LIMIT)
+                break
+            except OSError:
+                if time.time() >= deadline:
+                    raise
+                await asyncio.sleep(1)
+        self._reply_task = asyncio.ensure_future(self._read_replies())
+        await self.send({"type": "hello", "worker": self.name})
+
+    async def _read_replies(self):
+        try:
+            while True:
+                received = await _read_message(self._reader)
+                if received is None:
+                    break
+                message, _ = received
+                future = self._pending.pop(message.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        finally:
+            self.closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_result({"type": "done"})
+            self._pending.clear()
+
+    # Results sent after the coordinator is gone are lost, it requeues those tasks when resumed
+    async def send(self, message: dict, payload: bytes = b""):
+        if self.closed:
+            return
+        async with self._write_lock:
+            try:
+                _write_message(self._writer, message, payload)
+                await self._writer.drain()
+            except ConnectionError as e:
+                logger.warning(f"Coordinator connection lost! {e}")
+                self.closed = True
+
+    async def request(self, message: dict) -> dict:
+        if self.closed:
+            return {"type": "done"}
+        self._request_counter += 1
+        future = asyncio.get_event_loop().create_future()
+        self._pending[self._request_counter] = future
+        await self.send(dict(message, id=self._request_counter))
+        if self.closed and not future.done():
+            return {"type": "done"}
+        return await future
+
+    async def heartbeat(self, interval_second: float):
+        while not self.closed:
+            await asyncio.sleep(interval_second)
+            await self.send({"type": "heartbeat"})
+
+    def close(self):
+        if self._reply_task is not None:
+            self._reply_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+
+
+class RemoteWorker(ParallerExecutor):
+    # Runs leased tasks with the local workspace, reports (and the used output files with stream_outputs) are sent back
+    def __init__(self, host: str, port: int, workspace_dir: str, parallel_size: int, template: Dict[str, Any], analyzer: AbstractAnalyzer,
+                 name: Optional[str] = None, heartbeat_second: float = 10.0, stream_outputs: bool = False,
+                 connect_timeout_second: float = 30.0, **kwargs):
+        # Reports are stored by the coordinator
+        super().__init__(workspace_dir, os.devnull, parallel_size, template, {}, analyzer, sampler=ListSampler([]), **kwargs)
+        self.name = name if name is not None else f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat_second = heartbeat_second
+        self.stream_outputs = stream_outputs
+        self.connect_timeout_second = connect_timeout_second
+        self._client = CoordinatorClient(host, port, self.name)
+
+    def _open_result_store(self) -> Optional[AbstractResultStore]:
+        return None
+
+    def _progress(self) -> str:
+        return f"{self._task_counter} on {self.name}"
+
+    def _worker_amount(self) -> int:
+        return self.executor_amount
+
+    async def _next_task(self) -> Optional[Task]:
+        while True:
+            reply = await self._client.request({"type": "lease"})
+            if reply["type"] == "task":
+                if reply.get("best_report") is not None:
+                    self._update_best_report(reply["best_report"])
+                return reply["task"], reply["properties"], reply["modified"]
+            if reply["type"] == "done":
+                return None
+            await asyncio.sleep(reply.get("second", 1.0))
+
+    async def _send_completed(self, task_number: int, state: str, values: Dict[str, Any], payload: bytes = b""):
+        await self._client.send({"type": "complete", "task": task_number, "state": state, "values": values}, payload)
+
+    async def _complete_task(self, task_number: int, state: str, **values):
+        self.journal.record(task_number, state, **values)
+        self._count_completed(state, values)
+        await self._send_completed(task_number, state, values)
+
+    async def _accept_report(self, report_lock: asyncio.Lock, task_number: int, bundled_report: dict, bundled_reports: List[dict],
+                             output_dir: Optional[str] = None, **values):
+        if self.keep_reports:
+            bundled_reports.append(bundled_report)
+        self._update_best_report(bundled_report["report"])
+        self.aggregator.add(bundled_report)
+        payload = b""
+        if self.stream_outputs and output_dir is not None:
+            payload = await asyncio.get_event_loop().run_in_executor(None, pack_outputs, output_dir, self.analyzer.required_outputs())
+        self.journal.record(task_number, TaskState.REPORTED, bundled_report=bundled_report, **values)
+        self._count_completed(TaskState.REPORTED, values)
+        values = dict(values, bundled_report=bundled_report)
+        await self._send_completed(task_number, TaskState.REPORTED, values, payload)
+
+    async def _run(self) -> List[dict]:
+        await self._client.connect(self.connect_timeout_second)
+        logger.info(f"Worker {self.name} connected to {self._client.host}:{self._client.port}")
+        heartbeat_task = asyncio.ensure_future(self._client.heartbeat(self.heartbeat_second))
+        try:
+            return await super()._run()
+        finally:
+            heartbeat_task.cancel()
+            self._client.close()
@@ -12,6 +12,22 @@ class EPOSOutput:
     WEIGHTS_ALPHA_BETA_CSV_FILE = "weights-alpha-beta.csv"
 
 
+class EPOSLogger:
+    # {logger property: EPOSOutput file written by it}
+    OUTPUT_FILES = {
+        "logger.GlobalCostLogger": EPOSOutput.GLOBAL_COST_CSV_FILE,
+        "logger.LocalCostMultiObjectiveLogger": EPOSOutput.LOCAL_COST_CSV_FILE,
+        "logger.TerminationLogger": EPOSOutput.TERMINATIONS_CSV_FILE,
+        "logger.SelectedPlanLogger": EPOSOutput.SELECTED_PLANS_CSV_FILE,
+        "logger.GlobalResponseVectorLogger": EPOSOutput.GLOBAL_RESPONSE_CSV_FILE,
+        "logger.PlanFrequencyLogger": EPOSOutput.INDEX_HISTOGRAM_CSV_FILE,
+        "logger.UnfairnessLogger": EPOSOutput.UNFAIRNESS_CSV_FILE,
+        "logger.GlobalComplexCostLogger": EPOSOutput.GLOBAL_COMPLEX_COST_CSV_FILE,
+        "logger.WeightsLogger": EPOSOutput.WEIGHTS_ALPHA_BETA_CSV_FILE,
+        "logger.ReorganizationLogger": EPOSOutput.NUM_REORGANIZATIONS_CSV_FILE,
+    }
+
+
 class EPOSFolder:
     OUTPUT_DIR = "output"
     DATASETS_DIR = "datasets"
@@ -0,0 +1,136 @@
+import json
+import os
+import time
+from typing import Iterator, List, Optional, Set, Dict, Tuple
+
+
+class TaskState:
+    QUEUED = "queued"
+    STARTED = "started"
+    OUTPUT = "output"
+    EXITED = "exited"
+    REPORTED = "reported"
+    FAILED = "failed"
+    PRUNED = "pruned"
+
+    # Tasks in these states are skipped on resume
+    COMPLETED = (REPORTED, FAILED, PRUNED)
+
+
+class TaskJournal:
+    FILE_NAME = "journal.jsonl"
+    _HEADER_KEY = "header"
+    _SERIES_KEY = "series"
+    # "none": left to the OS, "batch": fsync every batch_size completed tasks or batch_interval_second, "file": fsync every completed task
+    DURABILITIES = ("none", "batch", "file")
+
+    # Tasks completed after the last fsync run again on resume after a crash, header and series records are always synced
+    def __init__(self, executor_dir: str, durability: str = "batch", batch_size: int = 64, batch_interval_second: float = 1.0):
+        if durability not in TaskJournal.DURABILITIES:
+            raise ValueError(f"Journal durability must be one of {TaskJournal.DURABILITIES}! {durability}")
+        if batch_size < 1:
+            raise ValueError("Batch size must >= 1!")
+        self.durability = durability
+        self.batch_size = batch_size
+        self.batch_interval_second = batch_interval_second
+        self.journal_path = os.path.join(executor_dir, TaskJournal.FILE_NAME)
+        self.header: Optional[dict] = None
+        self.completed_tasks: Set[int] = set()
+        # {completed state: amount} loaded from the journal
+        self.completed_amounts: Dict[str, int] = {i: 0 for i in TaskState.COMPLETED}
+        # {task number: (output dir, modified values)} of reported tasks whose series were never written
+        # Only tracked if the header has "series", the others are dropped once their series are recorded
+        self.unwritten_series: Dict[int, Tuple[str, dict]] = {}
+        # {task number: output dir} of tasks not completed yet
+        self._outputs: Dict[int, str] = {}
+        # Tasks whose series were written before they were reported
+        self._early_series: Set[int] = set()
+        if os.path.isfile(self.journal_path):
+            self._load()
+        self._file = open(self.journal_path, "a")
+        # Completed tasks written since the last fsync
+        self._pending = 0
+        self._last_sync_time = time.time()
+
+    def _load(self):
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Last line may be cut off by a crash
+                    continue
+                if TaskJournal._HEADER_KEY in record:
+                    self.header = record[TaskJournal._HEADER_KEY]
+                elif TaskJournal._SERIES_KEY in record:
+                    for task_number in record[TaskJournal._SERIES_KEY]:
+                        if self.unwritten_series.pop(task_number, None) is None:
+                            self._early_series.add(task_number)
+                elif record["state"] == TaskState.OUTPUT:
+                    self._outputs[record["task"]] = record["output"]
+                elif record["state"] in TaskState.COMPLETED:
+                    self.completed_tasks.add(record["task"])
+                    self.completed_amounts[record["state"]] += 1
+                    output_dir = self._outputs.pop(record["task"], None)
+                    if record["state"] == TaskState.REPORTED:
+                        if record["task"] in self._early_series:
+                            self._early_series.discard(record["task"])
+                        elif output_dir is not None and self.header is not None and self.header["series"]:
+                            self.unwritten_series[record["task"]] = (output_dir, record["bundled_report"]["modified"])
+        self._outputs = {}
+        self._early_series = set()
+
+    # Yield (task number, bundled report) of the reported tasks in journal order, read again from the file every time
+    def reports(self) -> Iterator[Tuple[int, dict]]:
+        if not os.path.isfile(self.journal_path):
+            return
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("state") == TaskState.REPORTED:
+                    yield record["task"], record["bundled_report"]
+
+    def _append(self, record: dict, sync: bool):
+        self._file.write(json.dumps(record, default=str) + "\n")
+        if sync:
+            self.sync()
+        else:
+            self._file.flush()
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync_time = time.time()
+
+    def write_header(self, header: dict):
+        self.header = header
+        self._append({TaskJournal._HEADER_KEY: header}, True)
+
+    # Only completed states are synced as the durability allows, the others are just flushed
+    def record(self, task_number: int, state: str, **values):
+        record = {"task": task_number, "state": state}
+        record.update(values)
+        sync = False
+        if state in TaskState.COMPLETED:
+            self.completed_tasks.add(task_number)
+            self._pending += 1
+            sync = self.durability == "file" or (self.durability == "batch" and (
+                    self._pending >= self.batch_size or time.time() - self._last_sync_time >= self.batch_interval_second))
+        self._append(record, sync)
+
+    # Series of these tasks are in the series dataset
+    def record_series(self, task_numbers: List[int]):
+        self._append({TaskJournal._SERIES_KEY: task_numbers}, True)
+
+    def close(self):
+        if self._pending > 0 and self.durability != "none":
+            self.sync()
+        self._file.close()
+
+    @staticmethod
+    def exists(executor_dir: str) -> bool:
+        return os.path.isfile(os.path.join(executor_dir, TaskJournal.FILE_NAME))
@@ -0,0 +1,77 @@
+import hashlib
+import subprocess
+import sys
+from typing import List, Optional
+
+
+class JVMProfile:
+    # gc: G1, Parallel, Serial, Z, Shenandoah
+    def __init__(self,
+                 class_data_sharing: bool = False,
+                 tiered_stop_at_level: Optional[int] = None,
+                 initial_heap_size: Optional[str] = None,
+                 max_heap_size: Optional[str] = None,
+                 gc: Optional[str] = None,
+                 extra_options: Optional[List[str]] = None):
+        if tiered_stop_at_level is not None and not 0 <= tiered_stop_at_level <= 4:
+            raise ValueError(f"Tiered compilation level must between 0 and 4! {tiered_stop_at_level}")
+        self.class_data_sharing = class_data_sharing
+        self.tiered_stop_at_level = tiered_stop_at_level
+        self.initial_heap_size = initial_heap_size
+        self.max_heap_size = max_heap_size
+        self.gc = gc
+        self.extra_options = extra_options if extra_options is not None else []
+
+    # JVM options without class data sharing ones
+    def options(self) -> List[str]:
+        result = []
+        if self.tiered_stop_at_level is not None:
+            result.append(f"-XX:TieredStopAtLevel={self.tiered_stop_at_level}")
+        if self.initial_heap_size is not None:
+            result.append(f"-Xms{self.initial_heap_size}")
+        if self.max_heap_size is not None:
+            result.append(f"-Xmx{self.max_heap_size}")
+        if self.gc is not None:
+            result.append(f"-XX:+Use{self.gc}GC")
+        result.extend(self.extra_options)
+        return result
+
+    # Archive must be used with the same jar, java version and options it was dumped with
+    def archive_name(self, jar_path: str, java_version: str) -> str:
+        digest = hashlib.sha1()
+        with open(jar_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest.update(java_version.encode())
+        digest.update(" ".join(self.options()).encode())
+        return f"{digest.hexdigest()[:16]}.jsa"
+
+    def __str__(self) -> str:
+        options = self.options()
+        if self.class_data_sharing:
+            options.append("-XX:SharedArchiveFile=<archive>")
+        return " ".join(options) if len(options) > 0 else "<default>"
+
+
+class StartupStats:
+    def __init__(self):
+        self.count = 0
+        self.total_second = 0.0
+        self.min_second = sys.float_info.max
+        self.max_second = 0.0
+
+    def add(self, second: float):
+        self.count += 1
+        self.total_second += second
+        self.min_second = min(self.min_second, second)
+        self.max_second = max(self.max_second, second)
+
+    def __str__(self) -> str:
+        if self.count == 0:
+            return "No startup recorded"
+        return "avg %.3fs, min %.3fs, max %.3fs over %d launches" % (self.total_second / self.count, self.min_second, self.max_second, self.count)
+
+
+def java_version() -> str:
+    # 'java -version' prints to stderr
+    return subprocess.run(["java", "-version"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True).stdout.decode().strip()
@@ -0,0 +1,122 @@
+import asyncio
+import gzip
+import os
+from typing import Callable, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Called with every decoded line until the output dir is found, return True to stop parsing
+LineHandler = Callable[[str], bool]
+
+
+class LogWriter:
+    _HEAD_RATIO = 0.5
+
+    # Keeps the first and the last part of a log larger than max_bytes (uncompressed)
+    def __init__(self, file, max_bytes: Optional[int] = None):
+        self._file = file
+        self.max_bytes = max_bytes
+        self._head_bytes = int(max_bytes * LogWriter._HEAD_RATIO) if max_bytes is not None else 0
+        self._tail_bytes = max_bytes - self._head_bytes if max_bytes is not None else 0
+        self._written = 0
+        self._tail = bytearray()
+        self._skipped = 0
+
+    def write(self, data: bytes):
+        if self.max_bytes is None:
+            self._file.write(data)
+            return
+        if self._written < self._head_bytes:
+            head = data[:self._head_bytes - self._written]
+            self._file.write(head)
+            self._written += len(head)
+            data = data[len(head):]
+        if len(data) > 0:
+            self._tail.extend(data)
+            if len(self._tail) > self._tail_bytes:
+                cut = len(self._tail) - self._tail_bytes
+                self._skipped += cut
+                del self._tail[:cut]
+
+    def close(self):
+        if self._skipped > 0:
+            self._file.write(f"{os.linesep}... {self._skipped} bytes skipped ...{os.linesep}".encode())
+        self._file.write(bytes(self._tail))
+        self._file.close()
+
+
+class LogPolicy:
+    MODES = ("chunks", "direct")
+    COMPRESSIONS = (None, "gzip", "zstd")
+    _SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+    # mode "chunks": lines are parsed until the output dir is found, the rest is copied in chunks
+    # mode "direct": EPOS writes the log file itself, it's only read until the output dir is found
+    def __init__(self, mode: str = "chunks", compression: Optional[str] = None, max_size_mb: Optional[float] = None,
+                 chunk_size: int = 64 * 1024, poll_interval_second: float = 0.05):
+        if mode not in LogPolicy.MODES:
+            raise ValueError(f"Log mode must be one of {LogPolicy.MODES}! {mode}")
+        if compression not in LogPolicy.COMPRESSIONS:
+            raise ValueError(f"Log compression must be one of {LogPolicy.COMPRESSIONS}! {compression}")
+        if mode == "direct" and (compression is not None or max_size_mb is not None):
+            raise ValueError("Direct log mode can't compress or cap logs!")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd log compression requires zstandard!")
+        self.mode = mode
+        self.compression = compression
+        self.max_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb is not None else None
+        self.chunk_size = chunk_size
+        self.poll_interval_second = poll_interval_second
+
+    def log_name(self, task_name: str) -> str:
+        return f"{task_name}.log{LogPolicy._SUFFIXES[self.compression]}"
+
+    def open_writer(self, log_path: str) -> LogWriter:
+        if self.compression == "gzip":
+            # Fastest level, logs are compressed while EPOS is running
+            file = gzip.open(log_path, "wb", compresslevel=1)
+        elif self.compression == "zstd":
+            file = zstandard.ZstdCompressor(level=3).stream_writer(open(log_path, "wb"))
+        else:
+            file = open(log_path, "wb")
+        return LogWriter(file, self.max_bytes)
+
+    # Read process output into writer
+    async def pump(self, stream: asyncio.StreamReader, writer: LogWriter, on_line: LineHandler):
+        parsing = True
+        while True:
+            if parsing:
+                data = await stream.readline()
+                if data == b"":
+                    break
+                parsing = not on_line(data.decode(errors="replace").strip())
+            else:
+                data = await stream.read(self.chunk_size)
+                if data == b"":
+                    break
+            writer.write(data)
+
+    # Read the log file written by the process until the output dir is found or the process exits
+    async def watch(self, log_path: str, process: asyncio.subprocess.Process, on_line: LineHandler):
+        partial = b""
+        with open(log_path, "rb") as f:
+            while True:
+                exited = process.returncode is not None
+                data = f.read()
+                lines = (partial + data).split(b"\n")
+                partial = lines.pop()
+                if exited:
+                    lines.append(partial)
+                for line in lines:
+                    if on_line(line.decode(errors="replace").strip()):
+                        return
+                if exited:
+                    return
+                await asyncio.sleep(self.poll_interval_second)
+
+    def __str__(self) -> str:
+        size = f"{self.max_bytes // (1024 * 1024)}MB" if self.max_bytes is not None else "unlimited"
+        return f"{self.mode}, compression: {self.compression}, max size: {size}"
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional, Deque, Tuple, Callable
+
+from epos_runner import proc_stats
+from epos_runner.journal import TaskState
+from epos_runner.log import logger
+
+
+class LiveMetrics:
+    # Upper bounds of the task wall time histogram in seconds
+    WALL_TIME_BUCKETS = (10, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+    _CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    # Serve /metrics (Prometheus text format) and /status (JSON) on host:port, and rewrite status_path every interval
+    def __init__(self, port: Optional[int] = None, host: str = "127.0.0.1", status_path: Optional[str] = None,
+                 interval_second: float = 5.0, throughput_window_second: float = 600.0):
+        self.port = port
+        self.host = host
+        self.status_path = status_path
+        self.interval_second = interval_second
+        self.throughput_window_second = throughput_window_second
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sample_task: Optional[asyncio.Future] = None
+        self._analysis_queue: Optional[asyncio.Queue] = None
+        self._eta_estimator: Optional[Callable[[], Optional[float]]] = None
+        self._summary: Optional[Callable[[], Dict[str, Any]]] = None
+        self._start_time = time.time()
+        self._total = 0
+        self._resumed = 0
+        self._completed: Dict[str, int] = {i: 0 for i in TaskState.COMPLETED}
+        self._cached = 0
+        # Finish times within the throughput window
+        self._finish_times: Deque[float] = deque()
+        self._wall_time_buckets = [0] * len(LiveMetrics.WALL_TIME_BUCKETS)
+        self._wall_time_sum = 0.0
+        self._wall_time_count = 0
+        # {task number: {"pid", "started", "sampled", "rss_bytes", "cpu_seconds", "cpu_percent"}}
+        self._jvms: Dict[int, Dict[str, Any]] = {}
+
+    # Called by an executor when it starts, tasks already completed by a resumed executor count as done
+    # Progress restarts with every executor, e.g. every round of a SEARCH, the throughput window is kept
+    # eta_estimator returns the ETA predicted by a cost model, None if it can't predict yet
+    # summary returns the best reports and Pareto front of the executor so far
+    async def start(self, total: int, completed: int, analysis_queue: Optional[asyncio.Queue] = None,
+                    eta_estimator: Optional[Callable[[], Optional[float]]] = None,
+                    summary: Optional[Callable[[], Dict[str, Any]]] = None):
+        self._total = total
+        self._analysis_queue = analysis_queue
+        self._eta_estimator = eta_estimator
+        self._summary = summary
+        self._resumed = completed
+        self._completed = {i: 0 for i in TaskState.COMPLETED}
+        self._cached = 0
+        self._jvms = {}
+        if self.port is not None:
+            self._server = await asyncio.start_server(self._serve, self.host, self.port)
+            logger.info(f"Metrics: http://{self.host}:{self.port}/metrics")
+        self._sample_task = asyncio.ensure_future(self._sample_loop())
+
+    # Total is lowered while tasks are generated when samples can be dropped
+    def set_total(self, total: int):
+        self._total = total
+
+    async def stop(self):
+        if self._sample_task is not None:
+            self._sample_task.cancel()
+            self._sample_task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._write_status()
+
+    def process_started(self, task_number: int, pid: int):
+        self._jvms[task_number] = {"pid": pid, "started": time.time(), "sampled": None, "rss_bytes": None, "cpu_seconds": None, "cpu_percent": None}
+
+    def process_exited(self, task_number: int, wall_second: float):
+        self._jvms.pop(task_number, None)
+        self._wall_time_sum += wall_second
+        self._wall_time_count += 1
+        for i, bound in enumerate(LiveMetrics.WALL_TIME_BUCKETS):
+            if wall_second <= bound:
+                self._wall_time_buckets[i] += 1
+
+    def task_completed(self, state: str, cached: bool = False):
+        self._completed[state] = self._completed.get(state, 0) + 1
+        if cached:
+            self._cached += 1
+        self._finish_times.append(time.time())
+
+    def _completed_amount(self) -> int:
+        return self._resumed + sum(self._completed.values())
+
+    def _throughput(self) -> Optional[float]:
+        now = time.time()
+        while len(self._finish_times) > 0 and self._finish_times[0] < now - self.throughput_window_second:
+            self._finish_times.popleft()
+        window = min(self.throughput_window_second, now - self._start_time)
+        if window <= 0:
+            return None
+        return len(self._finish_times) / window * 60
+
+    # Remaining tasks divided by the rolling throughput
+    def _eta_second(self) -> Optional[float]:
+        throughput = self._throughput()
+        if throughput is None or throughput == 0:
+            return None
+        return max(self._total - self._completed_amount(), 0) / throughput * 60
+
+    def _sample(self):
+        now = time.time()
+        for jvm in self._jvms.values():
+            jvm["rss_bytes"] = proc_stats.process_rss_bytes(jvm["pid"])
+            cpu_seconds = proc_stats.process_cpu_seconds(jvm["pid"])
+            if cpu_seconds is not None and jvm["cpu_seconds"] is not None and now > jvm["sampled"]:
+                jvm["cpu_percent"] = (cpu_seconds - jvm["cpu_seconds"]) / (now - jvm["sampled"]) * 100
+            jvm["cpu_seconds"] = cpu_seconds
+            jvm["sampled"] = now
+
+    async def _sample_loop(self):
+        while True:
+            try:
+                self._sample()
+                self._write_status()
+            except OSError as e:
+                logger.warning(f"Metrics status can't be written! {e}")
+            except Exception as e:
+                # Metrics never stop the sweep
+                logger.exception(f"Metrics sampling error! {e}")
+            await asyncio.sleep(self.interval_second)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "time": time.time(),
+            "uptime_second": time.time() - self._start_time,
+            "total": self._total,
+            "completed": self._completed_amount(),
+            "completed_by_state": dict(self._completed),
+            "cached": self._cached,
+            "running": len(self._jvms),
+            "pending": max(self._total - self._completed_amount() - len(self._jvms), 0),
+            "analysis_queue_depth": self._analysis_queue.qsize() if self._analysis_queue is not None else 0,
+            "tasks_per_minute": self._throughput(),
+            "eta_second": self._eta_second(),
+            "predicted_eta_second": self._eta_estimator() if self._eta_estimator is not None else None,
+            "wall_second": {
+                "buckets": dict(zip([str(i) for i in LiveMetrics.WALL_TIME_BUCKETS], self._wall_time_buckets)),
+                "sum": self._wall_time_sum,
+                "count": self._wall_time_count,
+            },
+            "jvms": [dict(task=task_number, **jvm) for task_number, jvm in sorted(self._jvms.items())],
+            "results": self._summary() if self._summary is not None else None,
+        }
+
+    def _write_status(self):
+        if self.status_path is None:
+            return
+        temp_path = self.status_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.status(), f, indent=2, default=str)
+        os.replace(temp_path, self.status_path)
+
+    @staticmethod
+    def _number(value: Optional[float]) -> str:
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return "NaN"
+        return repr(float(value))
+
+    def prometheus(self) -> str:
+        status = self.status()
+        lines: List[str] = []
+
+        def metric(name: str, metric_type: str, help_text: str, samples: List[Tuple[str, Optional[float]]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {LiveMetrics._number(value)}")
+
+        metric("epos_tasks", "gauge", "Tasks of the sweep", [("", status["total"])])
+        metric("epos_tasks_completed_total", "counter", "Completed tasks by state",
+               [(f'{{state="{state}"}}', amount) for state, amount in sorted(status["completed_by_state"].items())])
+        metric("epos_tasks_cached_total", "counter", "Tasks loaded from the result cache", [("", status["cached"])])
+        metric("epos_tasks_running", "gauge", "Running EPOS processes", [("", status["running"])])
+        metric("epos_tasks_pending", "gauge", "Tasks not started yet", [("", status["pending"])])
+        metric("epos_analysis_queue_depth", "gauge", "Finished outputs waiting for analysis", [("", status["analysis_queue_depth"])])
+        metric("epos_tasks_per_minute", "gauge", "Rolling throughput", [("", status["tasks_per_minute"])])
+        metric("epos_eta_seconds", "gauge", "Rolling estimate of the remaining time", [("", status["eta_second"])])
+        metric("epos_predicted_eta_seconds", "gauge", "Remaining time predicted by the cost model", [("", status["predicted_eta_second"])])
+        buckets = [(f'{{le="{bound}"}}', amount) for bound, amount in zip(LiveMetrics.WALL_TIME_BUCKETS, self._wall_time_buckets)]
+        buckets.append(('{le="+Inf"}', self._wall_time_count))
+        lines.append("# HELP epos_task_wall_seconds Wall time of EPOS processes")
+        lines.append("# TYPE epos_task_wall_seconds histogram")
+        for labels, value in buckets:
+            lines.append(f"epos_task_wall_seconds_bucket{labels} {LiveMetrics._number(value)}")
+        lines.append(f"epos_task_wall_seconds_sum {LiveMetrics._number(self._wall_time_sum)}")
+        lines.append(f"epos_task_wall_seconds_count {LiveMetrics._number(self._wall_time_count)}")
+        results = status["results"] if status["results"] is not None else {"objectives": {}, "best": None, "pareto_front": []}
+        best = results["best"]["report"] if results["best"] is not None else {}
+        metric("epos_best_objective", "gauge", "Objective values of the best report",
+               [(f'{{objective="{key}"}}', best[key] if isinstance(best.get(key), (int, float)) else None) for key in sorted(results["objectives"])])
+        metric("epos_pareto_front_size", "gauge", "Reports on the Pareto front of the objectives", [("", len(results["pareto_front"]))])
+        jvm_labels = [(f'{{task="{i["task"]}",pid="{i["pid"]}"}}', i) for i in status["jvms"]]
+        metric("epos_jvm_rss_bytes", "gauge", "Resident memory of running EPOS processes", [(labels, i["rss_bytes"]) for labels, i in jvm_labels])
+        metric("epos_jvm_cpu_percent", "gauge", "CPU usage of running EPOS processes", [(labels, i["cpu_percent"]) for labels, i in jvm_labels])
+        return "\n".join(lines) + "\n"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode(errors="replace").split()
+            # Skip headers
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            path = request_line[1].split("?")[0] if len(request_line) > 1 else ""
+            if path == "/metrics":
+                status, content_type, body = "200 OK", LiveMetrics._CONTENT_TYPE, self.prometheus()
+            elif path == "/status":
+                status, content_type, body = "200 OK", "application/json", json.dumps(self.status(), indent=2, default=str)
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", "Not found\n"
+            content = body.encode()
+            writer.write(f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(content)}\r\n\r\n".encode() + content)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
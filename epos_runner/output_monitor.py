@@ -0,0 +1,32 @@
+import csv
+import os
+from typing import List, Optional
+
+
+# Read rows appended to a csv file by a running EPOS process
+class OutputTail:
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.header: Optional[List[str]] = None
+        self.rows: List[List[str]] = []
+        self._offset = 0
+        self._partial = b""
+
+    # Return True if new rows were read
+    def poll(self) -> bool:
+        if not os.path.isfile(self.file_path):
+            return False
+        with open(self.file_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        if len(data) == 0:
+            return False
+        self._offset += len(data)
+        lines = (self._partial + data).split(b"\n")
+        # Last line may still be written
+        self._partial = lines.pop()
+        new_rows = [row for row in csv.reader(i.decode() for i in lines) if len(row) > 0]
+        if self.header is None and len(new_rows) > 0:
+            self.header = new_rows.pop(0)
+        self.rows.extend(new_rows)
+        return len(new_rows) > 0
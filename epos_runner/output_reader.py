@@ -0,0 +1,134 @@
+import os
+import warnings
+from itertools import islice
+from typing import Dict, List, Optional, Iterator, Tuple
+
+from epos_runner.epos_files import EPOSOutput
+from epos_runner.properties import Properties
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+class EPOSTable:
+    # data: float64 array (rows, columns), non-numeric cells are nan
+    def __init__(self, columns: Optional[List[str]], data: "np.ndarray"):
+        self.columns = columns
+        self.data = data
+
+    def column(self, name: str) -> "np.ndarray":
+        if self.columns is None:
+            raise KeyError(f"Table has no header! {name}")
+        return self.data[:, self.columns.index(name)]
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+
+class EPOSOutputReader:
+    _DEFAULT_CHUNK_ROWS = 65536
+
+    def __init__(self, output_dir: str):
+        if np is None:
+            raise ImportError("EPOSOutputReader requires numpy!")
+        self.output_dir = output_dir
+        self._tables: Dict[str, EPOSTable] = {}
+
+    def _path(self, file_name: str) -> str:
+        file_path = os.path.join(self.output_dir, file_name)
+        if not os.path.isfile(file_path):
+            raise IOError(f"EPOS output can't be found in: {file_path}")
+        return file_path
+
+    # Return (header, first data lines)
+    @staticmethod
+    def _read_header(f) -> Tuple[Optional[List[str]], List[str]]:
+        line = f.readline()
+        cells = [i.strip() for i in line.split(",")]
+        try:
+            [float(i) for i in cells if i != ""]
+        except ValueError:
+            return cells, []
+        # First line is data
+        return None, [line]
+
+    @staticmethod
+    def _parse(lines: List[str]) -> "np.ndarray":
+        with warnings.catch_warnings():
+            # Empty input is a normal end of file
+            warnings.simplefilter("ignore", UserWarning)
+            try:
+                return np.loadtxt(lines, delimiter=",", ndmin=2, dtype=np.float64)
+            except ValueError:
+                # Non-numeric cells or repeated headers become nan
+                return np.atleast_2d(np.genfromtxt(lines, delimiter=",", dtype=np.float64))
+
+    # Read a whole csv file once, later calls return the same table
+    def table(self, file_name: str) -> EPOSTable:
+        if file_name not in self._tables:
+            with open(self._path(file_name), "r") as f:
+                columns, lines = EPOSOutputReader._read_header(f)
+                lines.extend(f.readlines())
+            self._tables[file_name] = EPOSTable(columns, EPOSOutputReader._parse(lines))
+        return self._tables[file_name]
+
+    # Read a large csv file in chunks of rows without keeping it in memory
+    def iter_chunks(self, file_name: str, chunk_rows: int = _DEFAULT_CHUNK_ROWS) -> Iterator[EPOSTable]:
+        with open(self._path(file_name), "r") as f:
+            columns, lines = EPOSOutputReader._read_header(f)
+            while True:
+                lines.extend(islice(f, chunk_rows - len(lines)))
+                if len(lines) == 0:
+                    break
+                yield EPOSTable(columns, EPOSOutputReader._parse(lines))
+                lines = []
+
+    @property
+    def global_complex_cost(self) -> EPOSTable:
+        return self.table(EPOSOutput.GLOBAL_COMPLEX_COST_CSV_FILE)
+
+    @property
+    def global_cost(self) -> EPOSTable:
+        return self.table(EPOSOutput.GLOBAL_COST_CSV_FILE)
+
+    @property
+    def global_response(self) -> EPOSTable:
+        return self.table(EPOSOutput.GLOBAL_RESPONSE_CSV_FILE)
+
+    @property
+    def index_histogram(self) -> EPOSTable:
+        return self.table(EPOSOutput.INDEX_HISTOGRAM_CSV_FILE)
+
+    @property
+    def local_cost(self) -> EPOSTable:
+        return self.table(EPOSOutput.LOCAL_COST_CSV_FILE)
+
+    @property
+    def num_reorganizations(self) -> EPOSTable:
+        return self.table(EPOSOutput.NUM_REORGANIZATIONS_CSV_FILE)
+
+    @property
+    def selected_plans(self) -> EPOSTable:
+        return self.table(EPOSOutput.SELECTED_PLANS_CSV_FILE)
+
+    @property
+    def terminations(self) -> EPOSTable:
+        return self.table(EPOSOutput.TERMINATIONS_CSV_FILE)
+
+    @property
+    def unfairness(self) -> EPOSTable:
+        return self.table(EPOSOutput.UNFAIRNESS_CSV_FILE)
+
+    @property
+    def weights_alpha_beta(self) -> EPOSTable:
+        return self.table(EPOSOutput.WEIGHTS_ALPHA_BETA_CSV_FILE)
+
+    @property
+    def used_conf(self) -> Dict[str, str]:
+        return Properties.load_file(self._path(EPOSOutput.USED_CONF_TXT_FILE))
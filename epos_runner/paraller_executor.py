@@ -1,44 +1,65 @@
 import asyncio
+import hashlib
+import heapq
+import json
 import os
+import shutil
+import subprocess
 import time
-from copy import deepcopy
-from itertools import product
-from typing import Dict, List, Tuple, Any, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from copy import copy
+from typing import Dict, List, Tuple, Any, Optional, Iterator
 
 from epos_runner import AbstractAnalyzer
-from epos_runner.epos_files import EPOSFolder
+from epos_runner.admission import AdmissionController
+from epos_runner.affinity import CPUAffinity
+from epos_runner.aggregator import StreamingAggregator
+from epos_runner.cost_model import CostModel
+from epos_runner.dataset_catalog import DatasetCatalog
+from epos_runner.epos_files import EPOSFolder, EPOSLogger
+from epos_runner.journal import TaskJournal, TaskState
+from epos_runner.jvm import JVMProfile, StartupStats, java_version
 from epos_runner.log import logger
+from epos_runner.log_pump import LogPolicy
+from epos_runner.metrics import LiveMetrics
+from epos_runner.output_monitor import OutputTail
 from epos_runner.properties import Properties
+from epos_runner.properties_store import PropertiesStore
 from epos_runner.report import Report
+from epos_runner.result_cache import ResultCache
+from epos_runner.retention import RetentionPolicy, TopOutputs
+from epos_runner.result_store import AbstractResultStore, open_result_store
+from epos_runner.series_store import SeriesStore, extract_series
+from epos_runner.sampler import AbstractSampler, GridSampler, Conditional, Constraint, TaskFilter, callable_identity, normalize_params
 
 
 class ParallerExecutor:
     EPOS_EXECUTOR_DIR = "executor"
     EPOS_EXECUTOR_PROPERTIES_DIR = "properties"
     EPOS_EXECUTOR_LOG_DIR = "log"
+    EPOS_EXECUTOR_SANDBOX_DIR = "sandbox"
+    EPOS_EXECUTOR_CACHE_DIR = "cache"
+    EPOS_CDS_DIR = "cds"
+    SUMMARY_FILE = "summary.json"
+    _CDS_TASK_NAME = "cds"
     _EPOS_JAR_PATH = "IEPOS-Tutorial.jar"
     # EPOS output folder name is depend on seconds
     _MIN_EXECUTE_INTERVAL_SECOND = 1
 
-    # Return ('full properties list', 'modified properties list')
+    # Yield ('full properties', 'modified properties') lazily
     @staticmethod
-    def _generate_properties(template: Dict[str, Any], params: Dict[str, List[Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        items_list = []
-        for key, value in params.items():
-            if not isinstance(value, list) and not isinstance(value, tuple) and not isinstance(value, set):
-                raise ValueError("Params value must be list, tuple or set!")
-            items_list.append([(key, v) for v in value])
-        new_properties_list = []
-        modified_properties_list = []
-        for items in product(*items_list):
-            new_properties = deepcopy(template)
-            modified_properties = {}
-            for key, value in items:
-                new_properties[key] = value
-                modified_properties[key] = value
-            new_properties_list.append(new_properties)
-            modified_properties_list.append(modified_properties)
-        return new_properties_list, modified_properties_list
+    def _generate_properties(template: Dict[str, Any], params: Dict[str, Any], sampler: AbstractSampler,
+                             constraints: Optional[List[Constraint]] = None,
+                             task_filter: Optional[TaskFilter] = None) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        if task_filter is None:
+            task_filter = TaskFilter(template, params, constraints, isinstance(sampler, GridSampler))
+        for modified_properties in sampler.samples(params):
+            # Values are never mutated, so a shallow copy is enough
+            new_properties = copy(template)
+            new_properties.update(modified_properties)
+            result = task_filter.apply(new_properties, dict(modified_properties))
+            if result is not None:
+                yield result
 
     @staticmethod
     def _validate_workspace(workspace_path: str) -> str:
@@ -53,105 +74,751 @@ class ParallerExecutor:
             raise ValueError(f"Can't find '{EPOSFolder.CONF_DIR}' in workspace '{workspace_path}'")
         return workspace_path
 
-    def __init__(self, workspace_dir: str, report_path: str, parallel_size: int, template: Dict[str, Any], params: Dict[str, List[Any]], analyzer: AbstractAnalyzer):
+    # Several executors may start in the same second
+    @staticmethod
+    def _new_executor_dir(workspace_dir: str) -> str:
+        executor_dir = os.path.join(workspace_dir, ParallerExecutor.EPOS_EXECUTOR_DIR, str(int(time.time())))
+        suffix = 0
+        result = executor_dir
+        while os.path.exists(result):
+            suffix += 1
+            result = f"{executor_dir}_{suffix}"
+        return result
+
+    def __init__(self, workspace_dir: str, report_path: str, parallel_size: int, template: Dict[str, Any], params: Dict[str, List[Any]], analyzer: AbstractAnalyzer,
+                 sandbox: bool = False, jvm_profile: Optional[JVMProfile] = None, admission: Optional[AdmissionController] = None,
+                 result_cache: Optional[ResultCache] = None, resume_dir: Optional[str] = None,
+                 sampler: Optional[AbstractSampler] = None, monitor_interval_second: float = 1.0,
+                 analysis_size: int = 1, report_backend: str = "csv", series_store: Optional[SeriesStore] = None,
+                 log_policy: Optional[LogPolicy] = None, retention: Optional[RetentionPolicy] = None,
+                 metrics: Optional[LiveMetrics] = None, affinity: Optional[CPUAffinity] = None,
+                 cost_model: Optional[CostModel] = None, task_lookahead: int = 1024, dataset_catalog: Optional[DatasetCatalog] = None,
+                 constraints: Optional[List[Constraint]] = None, properties_durability: str = "batch",
+                 journal_durability: str = "batch", top_k: int = 10, max_front_size: int = 256, keep_reports: bool = True):
         self.workspace_dir = ParallerExecutor._validate_workspace(workspace_dir)
         self.report_path = report_path
+        # "csv" or "sqlite", resumed executors keep their backend
+        self.report_backend = report_backend
         self.executor_amount = parallel_size
         self.analyzer = analyzer
-        self.executor_dir = os.path.join(workspace_dir, ParallerExecutor.EPOS_EXECUTOR_DIR, str(int(time.time())))
+        self.template = template
+        self.params = params
+        # Full grid of params by default
+        self.sampler = sampler if sampler is not None else GridSampler()
+        # Tasks violating a constraint are never generated
+        self.constraints = constraints if constraints is not None else []
+        self.sandbox = sandbox
+        self.jvm_profile = jvm_profile
+        # PARALLEL_SIZE is the ceiling of the admission controller
+        self.admission = admission
+        self.result_cache = result_cache
+        self.monitor_interval_second = monitor_interval_second
+        if analysis_size < 1:
+            raise ValueError("Analysis size must >= 1!")
+        # Analyzer processes, running EPOS processes wait for them when all are busy
+        self.analysis_size = analysis_size
+        # Per-iteration series of every reported task, shared by all executors of a search
+        self.series_store = series_store
+        self.log_policy = log_policy if log_policy is not None else LogPolicy()
+        # What is left of an output dir after its report is generated
+        self.retention = retention if retention is not None else RetentionPolicy()
+        self.metrics = metrics
+        # Pin every EPOS process to its own CPU slot
+        self.affinity = affinity
+        # Launch the longest expected task of the next task_lookahead tasks first, None keeps the sampler order
+        self.cost_model = cost_model
+        if task_lookahead < 1:
+            raise ValueError("Task lookahead must >= 1!")
+        self.task_lookahead = task_lookahead
+        # Tasks whose numAgents, numPlans or planDim don't fit their dataset fail without starting EPOS
+        self.dataset_catalog = dataset_catalog
+        # Best reports and Pareto front so far, updated by every report
+        self.aggregator = StreamingAggregator(analyzer, top_k, max_front_size)
+        # False returns only the reports of the aggregator, so memory doesn't grow with the sweep
+        self.keep_reports = keep_reports
+        self._top_outputs = TopOutputs(analyzer, self.retention.keep_top) if self.retention.keep_top > 0 else None
+        if resume_dir is not None:
+            if not TaskJournal.exists(resume_dir):
+                raise ValueError(f"Can't find '{TaskJournal.FILE_NAME}' in executor dir '{resume_dir}'")
+            self.executor_dir = resume_dir
+        else:
+            self.executor_dir = ParallerExecutor._new_executor_dir(workspace_dir)
         self.executor_properties_path = os.path.join(self.executor_dir, self.EPOS_EXECUTOR_PROPERTIES_DIR)
         self.executor_log_path = os.path.join(self.executor_dir, self.EPOS_EXECUTOR_LOG_DIR)
-        self.properties_list, self.modified_value_list = self._generate_properties(template, params)
-        self._task_name_list = self._init_environment()
-        self._task_counter = 0
+        self.executor_sandbox_path = os.path.join(self.executor_dir, self.EPOS_EXECUTOR_SANDBOX_DIR)
+        self.executor_cache_path = os.path.join(self.executor_dir, self.EPOS_EXECUTOR_CACHE_DIR)
+        self._init_environment()
+        # Completed tasks are synced like the properties manifest, see TaskJournal.DURABILITIES
+        self.journal_durability = journal_durability
+        self.journal = self._open_journal()
+        # Properties of launched tasks, their .properties files only exist while they run
+        self.properties_store = PropertiesStore(self.executor_properties_path, template, properties_durability)
+        self._task_counter = len(self.journal.completed_tasks)
+        self._failed_task_counter = self.journal.completed_amounts[TaskState.FAILED]
+        self._pruned_task_counter = self.journal.completed_amounts[TaskState.PRUNED]
+        self._invalid_task_counter = 0
+        self._best_report: Optional[dict] = None
+        for _, bundled_report in self.journal.reports():
+            self._update_best_report(bundled_report["report"])
+            self.aggregator.add(bundled_report)
         self._last_execute_time = 0
-        self._total_tasks_amount = len(self._task_name_list)
+        self._cds_archive_path: Optional[str] = None
+        self._startup_stats = StartupStats()
+        self._cached_task_counter = 0
+        self._sampled_tasks_amount = self.sampler.count(params)
+        self._task_filter = TaskFilter(template, params, self.constraints, isinstance(self.sampler, GridSampler))
+        # Only an upper bound while dropped samples are still unknown, exact once all tasks are generated
+        self._total_tasks_amount = self._sampled_tasks_amount
+        self._total_exact = not self._task_filter.filtering
+        self._required_outputs = self._collect_required_outputs()
+        self.result_store: Optional[AbstractResultStore] = None
+        # One thread for result cache and series writes, so copies and compression never block the event loop
+        self._store_writer: Optional[ThreadPoolExecutor] = None
+        self._tasks: Iterator[Tuple[int, Dict[str, Any], dict]] = iter([])
+        # Tasks generated but not launched yet, as a max heap of predicted wall time
+        self._lookahead_tasks: List[Tuple[float, int, Tuple[int, Dict[str, Any], dict]]] = []
+        # {task number: (launch time, properties)}
+        self._running_tasks: Dict[int, Tuple[float, Dict[str, Any]]] = {}
 
-    # Return [(properties name, log name, modified values)]
-    def _init_environment(self) -> List[Tuple[str, str, dict]]:
+    def _init_environment(self):
         if not os.path.isdir(self.executor_properties_path):
             os.makedirs(self.executor_properties_path)
         if not os.path.isdir(self.executor_log_path):
             os.makedirs(self.executor_log_path)
-        result = [(f"{i}.properties", f"{i}.log", self.modified_value_list[i]) for i in range(len(self.properties_list))]
-        for i, properties in enumerate(self.properties_list):
-            properties = self.analyzer.required_propreties(properties)
-            # Force use LogLevel.SEVERE
-            properties["logLevel"] = "SEVERE"
-            properties_path = os.path.join(self.executor_properties_path, result[i][0])
-            Properties.save_file(properties_path, properties)
-        return result
+        if self.sandbox and not os.path.isdir(self.executor_sandbox_path):
+            os.makedirs(self.executor_sandbox_path)
+
+    # Identifies the reports of this executor dir in the result store
+    @property
+    def _run_name(self) -> str:
+        return os.path.basename(os.path.normpath(self.executor_dir))
+
+    # Same template, params and sampler always generate the same task numbers
+    def _fingerprint(self) -> str:
+        conditionals = {key: [repr(value), callable_identity(value.condition) if value.condition is not None else None]
+                        for key, value in self.params.items() if isinstance(value, Conditional)}
+        constraints = [callable_identity(i) for i in self.constraints]
+        content = [self.template, normalize_params(self.params), repr(self.sampler), conditionals, constraints]
+        content = json.dumps(content, sort_keys=True, default=repr)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _open_journal(self) -> TaskJournal:
+        journal = TaskJournal(self.executor_dir, self.journal_durability)
+        if journal.header is None:
+            journal.write_header({"fingerprint": self._fingerprint(), "report_path": os.path.abspath(self.report_path), "report_backend": self.report_backend,
+                                  "series": self.series_store is not None})
+        else:
+            if journal.header["fingerprint"] != self._fingerprint():
+                journal.close()
+                raise ValueError(f"Template, params or sampler changed since executor dir '{self.executor_dir}' was created! "
+                                 f"Samplers without a seed pick a new one every run, set the seed logged by the first run to resume")
+            # Keep adding to the same report
+            self.report_path = journal.header["report_path"]
+            self.report_backend = journal.header["report_backend"]
+        return journal
+
+    # Yield (task number, full properties, modified values)
+    def _generate_tasks(self) -> Iterator[Tuple[int, Dict[str, Any], dict]]:
+        self._task_filter = TaskFilter(self.template, self.params, self.constraints, isinstance(self.sampler, GridSampler))
+        tasks = self._generate_properties(self.template, self.params, self.sampler, task_filter=self._task_filter)
+        for i, (properties, modified_values) in enumerate(tasks):
+            if self._task_filter.dropped > 0:
+                self._update_total(self._sampled_tasks_amount - self._task_filter.dropped)
+            if i not in self.journal.completed_tasks:
+                yield i, properties, modified_values
+        self._update_total(self._sampled_tasks_amount - self._task_filter.dropped)
+        self._total_exact = True
+        if self._task_filter.dropped > 0:
+            logger.info(f"{self._task_filter.dropped} of {self._sampled_tasks_amount} sampled combinations dropped by conditions, constraints or duplicates")
+
+    def _update_total(self, total: int):
+        self._total_tasks_amount = total
+        if self.metrics is not None:
+            self.metrics.set_total(total)
+
+    # Longest expected task first within a bounded window, so heavy tasks don't leave a long tail at the end
+    def _order_tasks(self, tasks: Iterator[Tuple[int, Dict[str, Any], dict]]) -> Iterator[Tuple[int, Dict[str, Any], dict]]:
+        if self.cost_model is None:
+            yield from tasks
+            return
+        self._lookahead_tasks = []
+        for task in tasks:
+            heapq.heappush(self._lookahead_tasks, (-self.cost_model.predict(task[1]), task[0], task))
+            if len(self._lookahead_tasks) >= self.task_lookahead:
+                yield heapq.heappop(self._lookahead_tasks)[2]
+        while len(self._lookahead_tasks) > 0:
+            yield heapq.heappop(self._lookahead_tasks)[2]
+
+    # Predicted work left divided by the parallel size, None until the cost model is calibrated
+    def _predicted_eta(self) -> Optional[float]:
+        if self.cost_model is None or not self.cost_model.calibrated:
+            return None
+        now = time.time()
+        lookahead_costs = [self.cost_model.predict(task[1]) for _, _, task in self._lookahead_tasks]
+        work = sum(lookahead_costs)
+        running_work = sum(max(self.cost_model.predict(properties) - (now - start), 0) for start, properties in self._running_tasks.values())
+        # Tasks the sampler hasn't generated yet cost as much as the ones waiting on average
+        unseen = self._total_tasks_amount - self._task_counter - len(self._running_tasks) - len(lookahead_costs)
+        if unseen > 0 and len(lookahead_costs) > 0:
+            work += unseen * work / len(lookahead_costs)
+        parallel_size = self.admission.limit if self.admission is not None else self._worker_amount()
+        return (work + running_work) / max(parallel_size, 1)
+
+    # Return None if the analyzer doesn't declare its outputs
+    def _collect_required_outputs(self) -> Optional[List[str]]:
+        required_outputs = self.analyzer.required_outputs()
+        if required_outputs is None:
+            return None
+        result = list(required_outputs)
+        if self.analyzer.monitored_output() is not None:
+            result.append(self.analyzer.monitored_output())
+        if self.series_store is not None:
+            result.extend(self.series_store.file_names)
+        known_outputs = set(EPOSLogger.OUTPUT_FILES.values())
+        for file_name in result:
+            if file_name not in known_outputs:
+                logger.warning(f"No logger writes required output '{file_name}'")
+        return sorted(set(result))
+
+    # Loggers disabled by _finalize_properties
+    def _disabled_loggers(self) -> List[str]:
+        if self._required_outputs is None:
+            return []
+        return [key for key, file_name in EPOSLogger.OUTPUT_FILES.items() if file_name not in self._required_outputs]
+
+    # Return (bytes of files in the latest workspace output dir, that dir) or None
+    def _estimate_output_bytes(self, file_names: List[str]) -> Optional[Tuple[int, str]]:
+        output_root = os.path.join(self.workspace_dir, EPOSFolder.OUTPUT_DIR)
+        if not os.path.isdir(output_root):
+            return None
+        output_dirs = [os.path.join(output_root, i) for i in os.listdir(output_root)]
+        output_dirs = [i for i in output_dirs if os.path.isdir(i) and any(os.path.isfile(os.path.join(i, j)) for j in file_names)]
+        if len(output_dirs) == 0:
+            return None
+        output_dir = max(output_dirs, key=os.path.getmtime)
+        size = sum(os.path.getsize(os.path.join(output_dir, i)) for i in file_names if os.path.isfile(os.path.join(output_dir, i)))
+        return size, output_dir
+
+    # Pre-flight check of the template, tasks are checked again one by one
+    def _check_template_dataset(self):
+        if self.dataset_catalog is None:
+            return
+        properties = self._finalize_properties(dict(self.template))
+        info = self.dataset_catalog.get(str(properties.get("dataset", "")).strip().strip("\"'"))
+        if info is not None:
+            logger.info(f"Dataset: {info}")
+        error = self.dataset_catalog.validate(properties)
+        if error is not None:
+            logger.warning(f"Template doesn't fit its dataset, tasks keeping these values will fail! {error}")
+
+    def _log_disabled_loggers(self):
+        disabled_loggers = self._disabled_loggers()
+        if len(disabled_loggers) == 0:
+            return
+        logger.info(f"Disabled loggers: {', '.join(i[len('logger.'):] for i in disabled_loggers)}")
+        estimate = self._estimate_output_bytes([EPOSLogger.OUTPUT_FILES[i] for i in disabled_loggers])
+        if estimate is not None:
+            size, output_dir = estimate
+            logger.info("Output saved: about %.2f MB per task, %.2f MB for all tasks (measured in %s)"
+                        % (size / 1024 / 1024, size * self._total_tasks_amount / 1024 / 1024, output_dir))
+
+    # Properties exactly as EPOS will read them
+    def _finalize_properties(self, properties: Dict[str, Any]) -> Dict[str, Any]:
+        if self._required_outputs is not None:
+            properties = copy(properties)
+            for key, file_name in EPOSLogger.OUTPUT_FILES.items():
+                properties[key] = "true" if file_name in self._required_outputs else "false"
+        # Properties forced by the analyzer win over disabled loggers
+        properties = self.analyzer.required_propreties(properties)
+        # Force use LogLevel.SEVERE
+        properties["logLevel"] = "SEVERE"
+        return properties
+
+    # Write properties just before the task is launched, return properties path
+    def _prepare_properties(self, task_name: str, properties: Dict[str, Any]) -> str:
+        return self.properties_store.materialize(task_name, properties)
+
+    # Own working dir per task sharing conf and datasets, so output folders can't collide
+    def _prepare_sandbox(self, task_name: str) -> str:
+        sandbox_path = os.path.join(self.executor_sandbox_path, task_name)
+        if not os.path.isdir(sandbox_path):
+            os.makedirs(sandbox_path)
+        for folder in (EPOSFolder.CONF_DIR, EPOSFolder.DATASETS_DIR):
+            link_path = os.path.join(sandbox_path, folder)
+            if not os.path.lexists(link_path):
+                os.symlink(os.path.abspath(os.path.join(self.workspace_dir, folder)), link_path, target_is_directory=True)
+        return sandbox_path
+
+    def _build_command(self, jar_path: str, properties_path: str, affinity_slot: Optional[int] = None) -> List[str]:
+        cmd = ["java"]
+        if self.jvm_profile is not None:
+            cmd.extend(self.jvm_profile.options())
+        if affinity_slot is not None:
+            cmd.extend(self.affinity.options(affinity_slot, cmd))
+        if self._cds_archive_path is not None:
+            # Fall back to normal class loading if the archive can't be mapped
+            cmd.extend([f"-XX:SharedArchiveFile={self._cds_archive_path}", "-Xshare:auto"])
+        cmd.extend(["-jar", jar_path, properties_path])
+        return cmd
+
+    # Dump an AppCDS archive with a minimal EPOS run once per workspace, return archive path
+    async def _prepare_cds_archive(self, jar_path: str) -> Optional[str]:
+        cds_dir = os.path.join(self.workspace_dir, ParallerExecutor.EPOS_CDS_DIR)
+        try:
+            archive_path = os.path.join(cds_dir, self.jvm_profile.archive_name(jar_path, java_version()))
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"Can't detect java version, CDS disabled! {e}")
+            return None
+        if os.path.isfile(archive_path):
+            return archive_path
+        if not os.path.isdir(cds_dir):
+            os.makedirs(cds_dir)
+        logger.info("Dumping CDS archive ... ...")
+        properties = copy(self.template)
+        properties["numSimulations"] = "1"
+        properties["numIterations"] = "1"
+        # Not a task, so it stays out of the properties manifest
+        properties_path = os.path.join(self.executor_properties_path, f"{ParallerExecutor._CDS_TASK_NAME}.properties")
+        Properties.save_file(properties_path, self._finalize_properties(properties), sync=False)
+        temp_archive_path = archive_path + ".tmp"
+        cmd = ["java"] + self.jvm_profile.options() + [f"-XX:ArchiveClassesAtExit={temp_archive_path}", "-jar", jar_path, properties_path]
+        log_path = os.path.join(self.executor_log_path, f"{ParallerExecutor._CDS_TASK_NAME}.log")
+        with open(log_path, "w") as log_file:
+            process = await asyncio.create_subprocess_exec(*cmd, stdout=log_file, stderr=asyncio.subprocess.STDOUT,
+                                                           cwd=self._prepare_sandbox(ParallerExecutor._CDS_TASK_NAME))
+            exit_value = await process.wait()
+        if exit_value != 0 or not os.path.isfile(temp_archive_path):
+            logger.warning(f"CDS archive dump failed (JDK 13+ required), CDS disabled! Log: {log_path}")
+            return None
+        os.replace(temp_archive_path, archive_path)
+        # Kept for debugging if the dump failed
+        os.remove(properties_path)
+        shutil.rmtree(os.path.join(self.executor_sandbox_path, ParallerExecutor._CDS_TASK_NAME), ignore_errors=True)
+        return archive_path
+
+    def _update_best_report(self, report: dict):
+        if self._best_report is None:
+            self._best_report = report
+        else:
+            candidates = [self._best_report, report]
+            self._best_report = candidates[self.analyzer.best_result(candidates)]
+
+    # Kill the process once the analyzer gives up on its monitored output, return True if pruned
+    async def _monitor_output(self, process: asyncio.subprocess.Process, output_dir: str) -> bool:
+        tail = OutputTail(os.path.join(output_dir, self.analyzer.monitored_output()))
+        while process.returncode is None:
+            await asyncio.sleep(self.monitor_interval_second)
+            if process.returncode is None and tail.poll() and self.analyzer.should_prune(tail.rows, self._best_report):
+                process.kill()
+                return True
+        return False
 
-    # Return report dict
-    async def _execute_jar(self,
-                           execute_lock: asyncio.Lock, print_lock: asyncio.Lock, report_lock: asyncio.Lock, execute_semaphore: asyncio.Semaphore,
-                           jar_path: str, properties_name: str, log_name: str, modified_values: dict) -> Optional[dict]:
+    # Return (output dir, exit value, time cost, pruned)
+    async def _launch(self, execute_lock: asyncio.Lock, jar_path: str, task_number: int, properties: Dict[str, Any],
+                      admission_slot: Optional[int]) -> Tuple[Optional[str], int, float, bool]:
         output_dir = None
-        properties_path = os.path.join(self.executor_properties_path, properties_name)
+        monitor_task: Optional[asyncio.Future] = None
+        properties_name = f"{task_number}.properties"
+        log_name = self.log_policy.log_name(str(task_number))
         log_path = os.path.join(self.executor_log_path, log_name)
-        cmd = ["java", "-jar", jar_path, properties_path]
-        async with execute_semaphore:
+        # Sandboxed tasks can't share output folders, so they launch without the lock and interval
+        locked = not self.sandbox
+        affinity_slot = self.affinity.acquire() if self.affinity is not None else None
+        if locked:
             await execute_lock.acquire()
-            execute_time_diff = time.time() - self._last_execute_time
-            if execute_time_diff < ParallerExecutor._MIN_EXECUTE_INTERVAL_SECOND:
-                await asyncio.sleep(execute_time_diff)
+        try:
+            properties_path = self._prepare_properties(str(task_number), properties)
+            cmd = self._build_command(jar_path, properties_path, affinity_slot)
+            preexec_fn = self.affinity.pin(affinity_slot) if affinity_slot is not None else None
+            if self.sandbox:
+                work_dir = self._prepare_sandbox(str(task_number))
+            else:
+                work_dir = self.workspace_dir
+                execute_time_diff = time.time() - self._last_execute_time
+                if execute_time_diff < ParallerExecutor._MIN_EXECUTE_INTERVAL_SECOND:
+                    await asyncio.sleep(ParallerExecutor._MIN_EXECUTE_INTERVAL_SECOND - execute_time_diff)
             self._last_execute_time = start_second = time.time()
-            with open(log_path, "w") as log_file:
-                process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, cwd=self.workspace_dir)
-                config_start = False
-                while True:
-                    line = await process.stdout.readline()
-                    if line == b'':
-                        break
-                    if line:
-                        line_str = line.decode().strip()
-                        # Write log
-                        log_file.write(line_str + os.linesep)
-                        log_file.flush()
-                        # Read output dir
-                        if output_dir is None:
-                            if line_str.startswith("CONFIGURATION"):
-                                config_start = True
-                            elif config_start and line_str.startswith("output") and "=" in line_str:
-                                output_dir = line_str[line_str.index("=") + 1:].strip()
-                                execute_lock.release()
-                exit_value = await process.wait()
-                if exit_value != 0:
-                    logger.info(f"Task error! Properties: {properties_name}  Log: {log_name}")
-            end_second = time.time()
+            config_start = False
+
+            # Read output dir, return True once it's found
+            def handle_line(line_str: str) -> bool:
+                nonlocal config_start, output_dir, monitor_task, locked
+                if not config_start and line_str.startswith("CONFIGURATION"):
+                    config_start = True
+                    self._startup_stats.add(time.time() - start_second)
+                elif config_start and line_str.startswith("output") and "=" in line_str:
+                    output_dir = os.path.join(work_dir, line_str[line_str.index("=") + 1:].strip())
+                    self.journal.record(task_number, TaskState.OUTPUT, output=output_dir)
+                    if self.analyzer.monitored_output() is not None:
+                        monitor_task = asyncio.ensure_future(self._monitor_output(process, output_dir))
+                    if locked:
+                        execute_lock.release()
+                        locked = False
+                    return True
+                return False
+
+            if self.log_policy.mode == "direct":
+                with open(log_path, "wb") as log_file:
+                    process = await asyncio.create_subprocess_exec(*cmd, stdout=log_file, stderr=asyncio.subprocess.STDOUT, cwd=work_dir,
+                                                                   preexec_fn=preexec_fn)
+            else:
+                process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, cwd=work_dir,
+                                                               preexec_fn=preexec_fn)
+            self.journal.record(task_number, TaskState.STARTED, pid=process.pid)
+            if self.metrics is not None:
+                self.metrics.process_started(task_number, process.pid)
+            if admission_slot is not None:
+                self.admission.track(admission_slot, process.pid)
+            if self.log_policy.mode == "direct":
+                await self.log_policy.watch(log_path, process, handle_line)
+            else:
+                log_writer = self.log_policy.open_writer(log_path)
+                try:
+                    await self.log_policy.pump(process.stdout, log_writer, handle_line)
+                finally:
+                    log_writer.close()
+            exit_value = await process.wait()
+            pruned = False
+            if monitor_task is not None:
+                if not monitor_task.done():
+                    monitor_task.cancel()
+                elif monitor_task.exception() is not None:
+                    # The run is judged by its report instead
+                    logger.warning(f"Output monitor error! Log: {log_name}  Error: {monitor_task.exception()}")
+                else:
+                    pruned = monitor_task.result()
+            self.journal.record(task_number, TaskState.EXITED, exit_value=exit_value)
+            if self.metrics is not None:
+                self.metrics.process_exited(task_number, time.time() - start_second)
+            if exit_value != 0 and not pruned:
+                logger.info(f"Task error! Properties: {properties_name}  Log: {log_name}")
+            self.properties_store.release(properties_path, failed=exit_value != 0 and not pruned)
+        finally:
+            # Process may exit before printing the output dir
+            if locked:
+                execute_lock.release()
+            if affinity_slot is not None:
+                self.affinity.release(affinity_slot)
+        return output_dir, exit_value, time.time() - start_second, pruned
+
+    # Working dir of the task holding output_dir, None without SANDBOX_MODE
+    def _sandbox_dir(self, output_dir: str) -> Optional[str]:
+        if not self.sandbox:
+            return None
+        relative_path = os.path.relpath(output_dir, self.executor_sandbox_path)
+        if relative_path.startswith(os.pardir):
+            return None
+        return os.path.join(self.executor_sandbox_path, relative_path.split(os.sep)[0])
+
+    # pool=None runs the policy in a thread
+    async def _apply_retention(self, output_dir: str, report: Optional[dict], pool: Optional[ProcessPoolExecutor]):
+        loop = asyncio.get_event_loop()
+        sandbox_dir = self._sandbox_dir(output_dir)
+        if sandbox_dir is not None:
+            try:
+                await loop.run_in_executor(pool, RetentionPolicy.unlink_sandbox, sandbox_dir)
+            except Exception as e:
+                logger.warning(f"Sandbox can't be cleaned! Sandbox: {sandbox_dir}  Error: {e}")
+        if self.retention.mode == "keep":
+            return
+        output_dirs = [output_dir]
+        if report is not None and self._top_outputs is not None:
+            output_dirs = self._top_outputs.offer(report, output_dir)
+        for i in output_dirs:
+            try:
+                await loop.run_in_executor(pool, self.retention.apply, i, self.analyzer.required_outputs(), self._sandbox_dir(i))
+            except Exception as e:
+                logger.warning(f"Retention policy failed! Output: {i}  Error: {e}")
+
+    # Record a completed state (reported, failed or pruned)
+    async def _complete_task(self, task_number: int, state: str, **values):
+        self.journal.record(task_number, state, **values)
+        self._count_completed(state, values)
+
+    def _count_completed(self, state: str, values: Dict[str, Any]):
+        if self.metrics is not None:
+            self.metrics.task_completed(state, values.get("cached", False))
+
+    # output_dir is None for cached reports
+    async def _accept_report(self, report_lock: asyncio.Lock, task_number: int, bundled_report: dict, bundled_reports: List[dict],
+                             output_dir: Optional[str] = None, **values):
+        # Analyzer first, so a report it can't rank isn't stored
+        self._update_best_report(bundled_report["report"])
+        self.aggregator.add(bundled_report)
+        async with report_lock:
+            self.result_store.append(self._run_name, task_number, bundled_report)
+        if self.keep_reports:
+            bundled_reports.append(bundled_report)
+        await self._complete_task(task_number, TaskState.REPORTED, bundled_report=bundled_report, **values)
+
+    # Runs on the store writer, so an entry can't be evicted while its output is copied
+    def _read_cached(self, task_number: int, cache_key: str) -> Optional[dict]:
+        cached = self.result_cache.get(cache_key)
+        if cached is not None and self.result_cache.has_output(cache_key):
+            output_dir = os.path.join(self.executor_cache_path, str(task_number), os.path.basename(cached["output"]))
+            self.result_cache.restore_output(cache_key, output_dir)
+            cached["output"] = os.path.relpath(output_dir, self.executor_cache_path)
+        return cached
+
+    # Return True if the same run is cached
+    async def _load_cached(self, print_lock: asyncio.Lock, report_lock: asyncio.Lock,
+                           task_number: int, cache_key: str, modified_values: dict, bundled_reports: List[dict]) -> bool:
+        cached = await asyncio.get_event_loop().run_in_executor(self._store_writer, self._read_cached, task_number, cache_key)
+        if cached is None:
+            return False
+        bundled_report = {"output": cached["output"], "modified": modified_values, "report": cached["report"]}
+        async with print_lock:
+            self._task_counter += 1
+            self._cached_task_counter += 1
+            logger.info(f"Task: {self._progress()} loaded from cache")
+        await self._accept_report(report_lock, task_number, bundled_report, bundled_reports, cached=True)
+        return True
+
+    # Successful runs are handed to the analysis stage
+    async def _execute_jar(self, execute_lock: asyncio.Lock, print_lock: asyncio.Lock, report_lock: asyncio.Lock, analysis_queue: asyncio.Queue,
+                           jar_path: str, task_number: int, properties: Dict[str, Any], modified_values: dict, bundled_reports: List[dict]):
+        properties = self._finalize_properties(properties)
+        if self.dataset_catalog is not None:
+            error = self.dataset_catalog.validate(properties)
+            if error is not None:
+                async with print_lock:
+                    self._task_counter += 1
+                    self._failed_task_counter += 1
+                    self._invalid_task_counter += 1
+                    logger.warning(f"Task: {self._progress()} invalid! {error}")
+                await self._complete_task(task_number, TaskState.FAILED, error=error)
+                return
+        cache_key = None
+        if self.result_cache is not None:
+            dataset_path = os.path.join(self.workspace_dir, EPOSFolder.DATASETS_DIR, str(properties.get("dataset", "")))
+            cache_key = self.result_cache.key(jar_path, dataset_path, properties, self.analyzer)
+            if await self._load_cached(print_lock, report_lock, task_number, cache_key, modified_values, bundled_reports):
+                return
+        if self.cost_model is not None:
+            self._running_tasks[task_number] = (time.time(), properties)
+        try:
+            if self.admission is not None:
+                admission_slot = await self.admission.acquire()
+                try:
+                    output_dir, exit_value, time_cost, pruned = await self._launch(execute_lock, jar_path, task_number, properties, admission_slot)
+                finally:
+                    await self.admission.release(admission_slot)
+            else:
+                output_dir, exit_value, time_cost, pruned = await self._launch(execute_lock, jar_path, task_number, properties, None)
+        finally:
+            self._running_tasks.pop(task_number, None)
+        # Pruned runs stop early and would bias the model
+        if self.cost_model is not None and exit_value == 0 and not pruned and output_dir is not None:
+            self.cost_model.observe(properties, time_cost)
         async with print_lock:
             self._task_counter += 1
-            logger.info(f"Task: {self._task_counter}/{self._total_tasks_amount} finished in %.2fs" % (end_second - start_second))
-        if output_dir is not None and os.path.isdir(output_dir) and exit_value == 0:
-            bundled_report = Report.generate_bundled_report(output_dir, modified_values, self.analyzer)
-            async with report_lock:
-                Report.append_bundled_report(self.report_path, bundled_report)
-            return bundled_report
-        return None
+            if pruned:
+                self._pruned_task_counter += 1
+                logger.info(f"Task: {self._progress()} pruned after %.2fs" % time_cost)
+            else:
+                logger.info(f"Task: {self._progress()} finished in %.2fs" % time_cost)
+        if pruned:
+            await self._complete_task(task_number, TaskState.PRUNED, output=output_dir)
+            if output_dir is not None:
+                await self._apply_retention(output_dir, None, None)
+        elif output_dir is not None and os.path.isdir(output_dir) and exit_value == 0:
+            if self.sandbox:
+                output_name = os.path.relpath(output_dir, self.executor_sandbox_path)
+            else:
+                output_name = None
+            # Blocks when the analysis stage is behind
+            await analysis_queue.put((task_number, output_dir, output_name, modified_values, cache_key))
+        else:
+            self._failed_task_counter += 1
+            await self._complete_task(task_number, TaskState.FAILED)
+
+    # Analyzer runs in a worker process, so the event loop keeps reading JVM output meanwhile
+    async def _analysis_worker(self, report_lock: asyncio.Lock, analysis_queue: asyncio.Queue, pool: ProcessPoolExecutor, bundled_reports: List[dict]):
+        loop = asyncio.get_event_loop()
+        while True:
+            job = await analysis_queue.get()
+            if job is None:
+                break
+            task_number, output_dir, output_name, modified_values, cache_key = job
+            reported = False
+            try:
+                bundled_report = await loop.run_in_executor(pool, Report.generate_bundled_report, output_dir, modified_values, self.analyzer, output_name)
+                if cache_key is not None:
+                    # Copied before retention touches the output dir
+                    await loop.run_in_executor(self._store_writer, self.result_cache.put, cache_key, bundled_report, output_dir)
+                if self.series_store is not None:
+                    try:
+                        series = await loop.run_in_executor(pool, extract_series, output_dir, self.series_store.file_names)
+                        self._record_series(await loop.run_in_executor(self._store_writer, self.series_store.append,
+                                                                       self._run_name, task_number, modified_values, series))
+                    except Exception as e:
+                        logger.warning(f"Series can't be collected! Output: {output_dir}  Error: {e}")
+                await self._accept_report(report_lock, task_number, bundled_report, bundled_reports, output_dir=output_dir)
+                reported = True
+                await self._apply_retention(output_dir, bundled_report["report"], pool)
+            except Exception as e:
+                # A dead analysis worker would leave the JVM workers blocked on the full queue
+                if reported:
+                    logger.warning(f"Output retention error! Output: {output_dir}  Error: {e}")
+                    continue
+                logger.exception(f"Task analysis error! Output: {output_dir}  Error: {e}")
+                self._failed_task_counter += 1
+                await self._complete_task(task_number, TaskState.FAILED, output=output_dir)
+
+    # Journaled, so a resumed executor knows which reported tasks still miss their series
+    def _record_series(self, flushed: List[Tuple[str, int]]):
+        task_numbers = [task_number for run, task_number in flushed if run == self._run_name]
+        if len(task_numbers) > 0:
+            self.journal.record_series(task_numbers)
+
+    # Series of reported tasks buffered when a previous run was killed, read again from their output dirs
+    async def _restore_series(self, pool: ProcessPoolExecutor):
+        if self.series_store is None or len(self.journal.unwritten_series) == 0:
+            return
+        loop = asyncio.get_event_loop()
+        missing = 0
+        for task_number, (output_dir, modified_values) in sorted(self.journal.unwritten_series.items()):
+            try:
+                series = await loop.run_in_executor(pool, extract_series, output_dir, self.series_store.file_names)
+            except Exception as e:
+                logger.debug(f"Series can't be restored! Output: {output_dir}  Error: {e}")
+                missing += 1
+                continue
+            self._record_series(await loop.run_in_executor(self._store_writer, self.series_store.append,
+                                                           self._run_name, task_number, modified_values, series))
+        self._record_series(await loop.run_in_executor(self._store_writer, self.series_store.flush))
+        logger.info(f"Series restored: {len(self.journal.unwritten_series) - missing} tasks")
+        if missing > 0:
+            logger.warning(f"Series of {missing} reported tasks are lost, their output dirs are gone")
+        self.journal.unwritten_series = {}
+
+    def _open_result_store(self) -> Optional[AbstractResultStore]:
+        result_store = open_result_store(self.report_path, self.report_backend)
+        result_store.restore(self._run_name, self.journal.reports())
+        return result_store
+
+    # "<=" until dropped samples are known
+    def _total_text(self) -> str:
+        return f"{self._total_tasks_amount}" if self._total_exact else f"<={self._total_tasks_amount}"
+
+    def _progress(self) -> str:
+        eta_second = self._predicted_eta()
+        if eta_second is None:
+            return f"{self._task_counter}/{self._total_text()}"
+        return f"{self._task_counter}/{self._total_text()} (ETA %d:%02d:%02d)" % (eta_second // 3600, eta_second % 3600 // 60, eta_second % 60)
+
+    # Return (task number, full properties, modified values) or None if there are no more tasks
+    async def _next_task(self) -> Optional[Tuple[int, Dict[str, Any], dict]]:
+        return next(self._tasks, None)
+
+    def _worker_amount(self) -> int:
+        return min(self.executor_amount, max(self._total_tasks_amount, 1))
+
+    # Pull tasks until there are no more
+    async def _worker(self, execute_lock: asyncio.Lock, print_lock: asyncio.Lock, report_lock: asyncio.Lock, analysis_queue: asyncio.Queue,
+                      jar_path: str, bundled_reports: List[dict]):
+        while True:
+            task = await self._next_task()
+            if task is None:
+                break
+            task_number, properties, modified_values = task
+            self.journal.record(task_number, TaskState.QUEUED)
+            await self._execute_jar(execute_lock, print_lock, report_lock, analysis_queue, jar_path, task_number, properties, modified_values, bundled_reports)
 
     async def _run(self) -> List[dict]:
         execute_lock = asyncio.Lock()
         print_lock = asyncio.Lock()
         report_lock = asyncio.Lock()
-        execute_semaphore = asyncio.Semaphore(self.executor_amount)
-        tasks = []
+        analysis_queue = asyncio.Queue(maxsize=self.analysis_size * 2)
         jar_path = os.path.join(self.workspace_dir, ParallerExecutor._EPOS_JAR_PATH)
-        for properties_name, log_name, modified_values in self._task_name_list:
-            task = self._execute_jar(
-                execute_lock, print_lock, report_lock, execute_semaphore,
-                jar_path, properties_name, log_name, modified_values
-            )
-            tasks.append(task)
-        logger.info(f"Total tasks: {len(tasks)}")
+        self._tasks = self._order_tasks(self._generate_tasks())
+        # Reports of a resumed executor dir
+        bundled_reports: List[dict] = [i[1] for i in self.journal.reports()] if self.keep_reports else []
+        self.result_store = self._open_result_store()
+        logger.info(f"JVM profile: {self.jvm_profile}")
+        logger.info(f"CPU affinity: {self.affinity}")
+        if self.jvm_profile is not None and self.jvm_profile.class_data_sharing:
+            self._cds_archive_path = await self._prepare_cds_archive(jar_path)
+            logger.info(f"CDS archive: {self._cds_archive_path}")
+        logger.info(f"Sampler: {self.sampler}")
+        if self.cost_model is not None:
+            logger.info(f"Cost model: {self.cost_model}, lookahead {self.task_lookahead} tasks")
+        logger.info(f"Total tasks: {self._total_text()}")
+        if self._task_counter > 0:
+            logger.info(f"Resumed tasks: {self._task_counter} completed")
+        self._log_disabled_loggers()
+        self._check_template_dataset()
         logger.info(f"Execution start!")
-        # noinspection PyTypeChecker
-        bundled_reports: List[Optional[dict]] = await asyncio.gather(*tasks)
-        success_bundled_reports: List[dict] = [i for i in bundled_reports if i is not None]
-        failed_task_amount = len(tasks) - len(success_bundled_reports)
-        if failed_task_amount > 0:
-            logger.warning(f"{failed_task_amount} tasks failed!")
+        sampler_task = self.admission.start() if self.admission is not None else None
+        if self.metrics is not None:
+            await self.metrics.start(self._total_tasks_amount, self._task_counter, analysis_queue,
+                                     self._predicted_eta if self.cost_model is not None else None, self.aggregator.summary)
+        workers = [
+            self._worker(execute_lock, print_lock, report_lock, analysis_queue, jar_path, bundled_reports)
+            for _ in range(self._worker_amount())
+        ]
+        self._store_writer = ThreadPoolExecutor(max_workers=1)
+        with ProcessPoolExecutor(max_workers=self.analysis_size) as pool:
+            await self._restore_series(pool)
+            analysis_workers = [
+                asyncio.ensure_future(self._analysis_worker(report_lock, analysis_queue, pool, bundled_reports))
+                for _ in range(self.analysis_size)
+            ]
+            jvm_workers = asyncio.ensure_future(asyncio.gather(*workers))
+            analysis = asyncio.gather(*analysis_workers)
+            try:
+                # Analysis workers only end after the JVM workers, so the first one done ends the run if it raised
+                await asyncio.wait([jvm_workers, analysis], return_when=asyncio.FIRST_COMPLETED)
+                if analysis.done():
+                    analysis.result()
+                    raise RuntimeError("Analysis workers stopped before all tasks were executed!")
+                jvm_workers.result()
+                for _ in analysis_workers:
+                    await analysis_queue.put(None)
+                await analysis
+            finally:
+                jvm_workers.cancel()
+                for analysis_worker in analysis_workers:
+                    analysis_worker.cancel()
+                await asyncio.gather(jvm_workers, analysis, return_exceptions=True)
+                if sampler_task is not None:
+                    sampler_task.cancel()
+                if self.metrics is not None:
+                    await self.metrics.stop()
+                # Pending writes finish first
+                self._store_writer.shutdown()
+                if self.series_store is not None:
+                    self._record_series(self.series_store.flush())
+                self.journal.close()
+                self.properties_store.close()
+                if self.result_store is not None:
+                    self.result_store.close()
+        if self._failed_task_counter > 0:
+            logger.warning(f"{self._failed_task_counter} tasks failed!")
+        if self._invalid_task_counter > 0:
+            logger.warning(f"{self._invalid_task_counter} tasks don't fit their dataset")
+        if self._pruned_task_counter > 0:
+            logger.info(f"{self._pruned_task_counter} tasks pruned")
+        if self.result_cache is not None:
+            logger.info(f"Cached tasks: {self._cached_task_counter}")
+        logger.info(f"JVM startup: {self._startup_stats}")
+        self._write_summary()
         logger.info(f"All tasks executed!")
-        return success_bundled_reports
+        return bundled_reports if self.keep_reports else self.aggregator.reports()
+
+    # executor/<timestamp>/summary.json, the Pareto front is logged when there are several objectives
+    def _write_summary(self):
+        logger.info(f"Results: {self.aggregator}")
+        if len(self.aggregator.objectives) > 1:
+            for bundled_report in self.aggregator.front():
+                objectives = ", ".join(f"{key} = {bundled_report['report'].get(key)}" for key in self.aggregator.objectives)
+                logger.info(f"Pareto front: {bundled_report['output']} {objectives}")
+        summary_path = os.path.join(self.executor_dir, self.SUMMARY_FILE)
+        try:
+            with open(summary_path, "w") as f:
+                json.dump(self.aggregator.summary(), f, indent=2, default=str)
+        except OSError as e:
+            logger.warning(f"Summary can't be written! {e}")
 
     # Return [{"output": "", "modified": {}, "report": ""}]
     def run(self) -> List[dict]:
@@ -0,0 +1,66 @@
+import os
+from typing import Optional, Dict
+
+_PROC_DIR = "/proc"
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+# Return values of /proc/meminfo in bytes
+def _read_meminfo() -> Dict[str, int]:
+    result = {}
+    with open(os.path.join(_PROC_DIR, "meminfo"), "r") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            value = value.split()
+            if len(value) > 0:
+                result[key] = int(value[0]) * (1024 if len(value) > 1 and value[1] == "kB" else 1)
+    return result
+
+
+def is_available() -> bool:
+    return os.path.isfile(os.path.join(_PROC_DIR, "meminfo"))
+
+
+def memory_available_bytes() -> Optional[int]:
+    try:
+        return _read_meminfo().get("MemAvailable")
+    except OSError:
+        return None
+
+
+def memory_total_bytes() -> Optional[int]:
+    try:
+        return _read_meminfo().get("MemTotal")
+    except OSError:
+        return None
+
+
+# 1 minute load average
+def load_average() -> Optional[float]:
+    try:
+        with open(os.path.join(_PROC_DIR, "loadavg"), "r") as f:
+            return float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def process_rss_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(os.path.join(_PROC_DIR, str(pid), "status"), "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+# User + system CPU time
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    try:
+        with open(os.path.join(_PROC_DIR, str(pid), "stat"), "r") as f:
+            # Process name may contain spaces, fields start after the last ')'
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    except (OSError, ValueError, IndexError):
+        return None
@@ -35,10 +35,7 @@ class Properties:
 
     @staticmethod
     def save(data: dict) -> str:
-        result = ''
-        for key, value in data.items():
-            result += Properties._write_line(key, value)
-        return result
+        return "".join(Properties._write_line(key, value) for key, value in data.items())
 
     @staticmethod
     def load_file(file_path: str) -> Dict[str, str]:
@@ -56,7 +53,6 @@ class Properties:
     @staticmethod
     def save_file(file_path: str, data: dict, sync: bool = True):
         with open(file_path, "w") as f:
-            for key, value in data.items():
-                f.write(Properties._write_line(key, value))
+            f.write(Properties.save(data))
             if sync:
                 os.fsync(f)
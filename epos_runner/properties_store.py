@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Set, Tuple
+
+from epos_runner.properties import Properties
+
+
+class PropertiesStore:
+    MANIFEST_FILE = "manifest.jsonl"
+    TEMPLATE_FILE = "template.properties"
+    # "none": left to the OS, "batch": fsync every batch_size tasks or batch_interval_second, "file": fsync every task
+    DURABILITIES = ("none", "batch", "file")
+
+    # Properties of every launched task are kept as a diff to the template in one manifest, equal diffs are stored once
+    # Real .properties files only exist while their task runs, failed ones are kept for debugging
+    def __init__(self, store_dir: str, template: Dict[str, Any], durability: str = "batch",
+                 batch_size: int = 256, batch_interval_second: float = 5.0, keep_files: bool = False):
+        if durability not in PropertiesStore.DURABILITIES:
+            raise ValueError(f"Properties durability must be one of {PropertiesStore.DURABILITIES}! {durability}")
+        if batch_size < 1:
+            raise ValueError("Batch size must >= 1!")
+        self.store_dir = store_dir
+        self.template = {str(k): str(v) for k, v in template.items()}
+        self.durability = durability
+        self.batch_size = batch_size
+        self.batch_interval_second = batch_interval_second
+        self.keep_files = keep_files
+        # Hashes of the diffs already in the manifest, the diffs and the task index stay on disk
+        self._digests: Set[str] = set()
+        self._task_amount = 0
+        if not os.path.isdir(store_dir):
+            os.makedirs(store_dir)
+        template_path = os.path.join(store_dir, PropertiesStore.TEMPLATE_FILE)
+        if not os.path.isfile(template_path):
+            Properties.save_file(template_path, self.template, sync=durability != "none")
+        manifest_path = os.path.join(store_dir, PropertiesStore.MANIFEST_FILE)
+        if os.path.isfile(manifest_path):
+            self._digests = PropertiesStore._load_digests(manifest_path)
+        self._file = open(manifest_path, "a")
+        self._pending = 0
+        self._last_sync_time = time.time()
+
+    # Tasks put by this store, not counting earlier runs of a resumed executor dir
+    def __len__(self) -> int:
+        return self._task_amount
+
+    @property
+    def unique_amount(self) -> int:
+        return len(self._digests)
+
+    @staticmethod
+    def _records(manifest_path: str):
+        with open(manifest_path, "r") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Torn last line of a crashed run
+                    continue
+
+    @staticmethod
+    def _load_digests(manifest_path: str) -> Set[str]:
+        return set(record["hash"] for record in PropertiesStore._records(manifest_path) if "diff" in record)
+
+    @staticmethod
+    def _load_manifest(manifest_path: str) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+        diffs = {}
+        index = {}
+        for record in PropertiesStore._records(manifest_path):
+            if "diff" in record:
+                diffs[record["hash"]] = record["diff"]
+            elif "task" in record:
+                index[record["task"]] = record["hash"]
+        return diffs, index
+
+    def _diff(self, properties: Dict[str, Any]) -> Dict[str, Any]:
+        changed = {}
+        for key, value in properties.items():
+            key, value = str(key), str(value)
+            if self.template.get(key) != value:
+                changed[key] = value
+        removed = sorted(key for key in self.template if key not in properties)
+        return {"set": changed, "unset": removed}
+
+    @staticmethod
+    def _apply(template: Dict[str, str], diff: Dict[str, Any]) -> Dict[str, str]:
+        result = dict(template)
+        for key in diff["unset"]:
+            result.pop(key, None)
+        result.update(diff["set"])
+        return result
+
+    def put(self, task_name: str, properties: Dict[str, Any]):
+        diff = self._diff(properties)
+        content = json.dumps(diff, sort_keys=True)
+        digest = hashlib.sha1(content.encode()).hexdigest()[:20]
+        lines = []
+        if digest not in self._digests:
+            self._digests.add(digest)
+            lines.append(json.dumps({"hash": digest, "diff": diff}, sort_keys=True))
+        self._task_amount += 1
+        lines.append(json.dumps({"task": task_name, "hash": digest}))
+        self._file.write("\n".join(lines) + "\n")
+        self._pending += 1
+        if self.durability == "file" or (self.durability == "batch" and (
+                self._pending >= self.batch_size or time.time() - self._last_sync_time >= self.batch_interval_second)):
+            self.sync()
+
+    def sync(self):
+        self._file.flush()
+        if self.durability != "none":
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync_time = time.time()
+
+    # Record the properties and write the .properties file EPOS reads, return its path
+    def materialize(self, task_name: str, properties: Dict[str, Any]) -> str:
+        self.put(task_name, properties)
+        properties_path = os.path.join(self.store_dir, f"{task_name}.properties")
+        # Read right away by EPOS, so the page cache is enough
+        Properties.save_file(properties_path, properties, sync=False)
+        return properties_path
+
+    def release(self, properties_path: str, failed: bool = False):
+        if self.keep_files or failed:
+            return
+        try:
+            os.remove(properties_path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    # {task name: properties} of a store dir, e.g. executor/<timestamp>/properties
+    @staticmethod
+    def read(store_dir: str) -> Dict[str, Dict[str, str]]:
+        template = dict(Properties.load_file(os.path.join(store_dir, PropertiesStore.TEMPLATE_FILE)))
+        diffs, index = PropertiesStore._load_manifest(os.path.join(store_dir, PropertiesStore.MANIFEST_FILE))
+        return {task_name: PropertiesStore._apply(template, diffs[digest]) for task_name, digest in index.items() if digest in diffs}
@@ -1,6 +1,6 @@
 import csv
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from epos_runner.analyzer import AbstractAnalyzer
 from epos_runner.log import logger
@@ -38,9 +38,9 @@ class Report:
         Report.print_report(best_output_name, best_modified_values, best_report)
 
     @staticmethod
-    def generate_bundled_report(output_dir: str, modified_values: dict, analyzer: AbstractAnalyzer) -> dict:
+    def generate_bundled_report(output_dir: str, modified_values: dict, analyzer: AbstractAnalyzer, output_name: Optional[str] = None) -> dict:
         return {
-            "output": os.path.basename(output_dir),
+            "output": os.path.basename(output_dir) if output_name is None else output_name,
             "modified": modified_values,
             "report": analyzer.generate_report(output_dir)
         }
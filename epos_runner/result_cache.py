@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from epos_runner.analyzer import AbstractAnalyzer
+from epos_runner.log import logger
+
+
+def _hash_file(digest, file_path: str):
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+
+def _dir_size(path: str) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            size += os.path.getsize(os.path.join(root, name))
+    return size
+
+
+class ResultCache:
+    REPORT_FILE = "report.json"
+    OUTPUT_DIR = "output"
+    # Evict until the cache is below this ratio of the max size
+    _EVICT_RATIO = 0.9
+
+    def __init__(self, cache_dir: str, max_size_mb: Optional[int] = 1024, keep_output: bool = False):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_mb * 1024 * 1024 if max_size_mb is not None else None
+        self.keep_output = keep_output
+        self._file_hashes: Dict[str, str] = {}
+        # key -> (last used time, size)
+        self._entries: Dict[str, Tuple[float, int]] = {}
+        self._total_size = 0
+        self._load_entries()
+
+    def _load_entries(self):
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        for prefix in os.listdir(self.cache_dir):
+            prefix_path = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_path):
+                continue
+            for key in os.listdir(prefix_path):
+                entry_path = os.path.join(prefix_path, key)
+                report_path = os.path.join(entry_path, ResultCache.REPORT_FILE)
+                if os.path.isfile(report_path):
+                    size = _dir_size(entry_path)
+                    self._entries[key] = (os.path.getmtime(report_path), size)
+                    self._total_size += size
+                else:
+                    # Unfinished entry
+                    shutil.rmtree(entry_path, ignore_errors=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    # Jar and dataset hashes are computed once per cache instance
+    def _hash_path(self, path: str) -> str:
+        if path not in self._file_hashes:
+            digest = hashlib.sha256()
+            if os.path.isfile(path):
+                _hash_file(digest, path)
+            elif os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    for name in sorted(files):
+                        file_path = os.path.join(root, name)
+                        digest.update(os.path.relpath(file_path, path).encode())
+                        _hash_file(digest, file_path)
+            self._file_hashes[path] = digest.hexdigest()
+        return self._file_hashes[path]
+
+    def key(self, jar_path: str, dataset_path: str, properties: Dict[str, Any], analyzer: AbstractAnalyzer) -> str:
+        digest = hashlib.sha256()
+        digest.update(self._hash_path(jar_path).encode())
+        digest.update(self._hash_path(dataset_path).encode())
+        digest.update(json.dumps({str(k): str(v) for k, v in properties.items()}, sort_keys=True).encode())
+        analyzer_class = type(analyzer)
+        digest.update(f"{analyzer_class.__module__}.{analyzer_class.__qualname__}:{analyzer.cache_version()}".encode())
+        return digest.hexdigest()
+
+    # Return {"output": "", "report": {}}
+    def get(self, key: str) -> Optional[dict]:
+        if key not in self._entries:
+            return None
+        report_path = os.path.join(self._entry_path(key), ResultCache.REPORT_FILE)
+        try:
+            with open(report_path, "r") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self._remove(key)
+            return None
+        now = time.time()
+        os.utime(report_path, (now, now))
+        self._entries[key] = (now, self._entries[key][1])
+        return result
+
+    def has_output(self, key: str) -> bool:
+        return os.path.isdir(os.path.join(self._entry_path(key), ResultCache.OUTPUT_DIR))
+
+    def restore_output(self, key: str, target_dir: str):
+        shutil.copytree(os.path.join(self._entry_path(key), ResultCache.OUTPUT_DIR), target_dir)
+
+    def put(self, key: str, bundled_report: dict, output_dir: Optional[str]):
+        entry_path = self._entry_path(key)
+        if key in self._entries:
+            return
+        # Sweeps sharing the cache may store the same key at the same time
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            os.makedirs(temp_path)
+            if self.keep_output and output_dir is not None:
+                shutil.copytree(output_dir, os.path.join(temp_path, ResultCache.OUTPUT_DIR))
+            with open(os.path.join(temp_path, ResultCache.REPORT_FILE), "w") as f:
+                json.dump({"output": bundled_report["output"], "report": bundled_report["report"]}, f, default=str)
+            os.rename(temp_path, entry_path)
+        except OSError as e:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            if not os.path.isfile(os.path.join(entry_path, ResultCache.REPORT_FILE)):
+                logger.warning(f"Result can't be cached! Key: {key}  Error: {e}")
+                return
+            # Already stored by another sweep
+        size = _dir_size(entry_path)
+        self._entries[key] = (time.time(), size)
+        self._total_size += size
+        self._evict()
+
+    def _remove(self, key: str):
+        _, size = self._entries.pop(key)
+        self._total_size -= size
+        shutil.rmtree(self._entry_path(key), ignore_errors=True)
+
+    # Least recently used entries go first
+    def _evict(self):
+        if self.max_size_bytes is None or self._total_size <= self.max_size_bytes:
+            return
+        target_size = self.max_size_bytes * ResultCache._EVICT_RATIO
+        evicted = 0
+        for key, _ in sorted(self._entries.items(), key=lambda x: x[1][0]):
+            if self._total_size <= target_size:
+                break
+            self._remove(key)
+            evicted += 1
+        logger.info(f"Result cache evicted {evicted} entries")
+
+    def clear(self):
+        for key in list(self._entries.keys()):
+            self._remove(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
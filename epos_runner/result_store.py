@@ -0,0 +1,229 @@
+import re
+import sqlite3
+import time
+from abc import abstractmethod
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+from epos_runner.report import Report
+
+
+class AbstractResultStore:
+    # run: executor dir name, (run, task_number) identifies a report
+    @abstractmethod
+    def append(self, run: str, task_number: int, bundled_report: dict):
+        pass
+
+    # Reports of a resumed executor dir, which may be lost after a crash
+    def restore(self, run: str, task_reports: Iterable[Tuple[int, dict]]):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class CSVResultStore(AbstractResultStore):
+    # Every row is synced, so nothing needs to be restored
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+
+    def append(self, run: str, task_number: int, bundled_report: dict):
+        Report.append_bundled_report(self.csv_path, bundled_report)
+
+    def __repr__(self) -> str:
+        return f"CSVResultStore({self.csv_path})"
+
+
+# Filter of query(), e.g. ("numChildren", ">=", 4)
+Condition = Tuple[str, str, Any]
+
+
+class SQLiteResultStore(AbstractResultStore):
+    TABLE = "results"
+    MODIFIED_PREFIX = "modified."
+    REPORT_PREFIX = "report."
+    OPERATORS = ("=", "!=", "<", "<=", ">", ">=")
+    _CONDITION_PATTERN = re.compile(r"^\s*([^<>=!]+?)\s*(<=|>=|!=|=|<|>)\s*(.*?)\s*$")
+
+    # Rows are committed in batches, a commit syncs the whole batch at once
+    def __init__(self, db_path: str, batch_size: int = 64, commit_interval_second: float = 2.0):
+        if batch_size < 1:
+            raise ValueError("Batch size must >= 1!")
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.commit_interval_second = commit_interval_second
+        self._connection = sqlite3.connect(db_path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.execute(f"CREATE TABLE IF NOT EXISTS {SQLiteResultStore.TABLE} "
+                                 f"(id INTEGER PRIMARY KEY, run TEXT NOT NULL, task INTEGER NOT NULL, output TEXT, UNIQUE(run, task))")
+        self._connection.commit()
+        self._columns = self._load_columns()
+        self._pending: List[Dict[str, Any]] = []
+        self._last_commit_time = time.time()
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    # Numbers keep their type, numeric strings like "4" are stored as numbers by NUMERIC affinity
+    @staticmethod
+    def _column_type(value: Any) -> str:
+        # Unknown yet, numbers still sort as numbers and text stays text
+        if value is None:
+            return "NUMERIC"
+        if isinstance(value, (bool, int)):
+            return "INTEGER"
+        if isinstance(value, float):
+            return "REAL"
+        if isinstance(value, str):
+            try:
+                float(value)
+                return "NUMERIC"
+            except ValueError:
+                pass
+        return "TEXT"
+
+    @staticmethod
+    def _cell(value: Any) -> Any:
+        if value is None or isinstance(value, (int, float, str)):
+            return value
+        return str(value)
+
+    def _load_columns(self) -> List[str]:
+        return [row[1] for row in self._connection.execute(f"PRAGMA table_info({SQLiteResultStore.TABLE})")]
+
+    # New params or report keys become new indexed columns
+    def _add_columns(self, row: Dict[str, Any]):
+        for column, value in row.items():
+            if column in self._columns:
+                continue
+            quoted = SQLiteResultStore._quote(column)
+            self._connection.execute(f"ALTER TABLE {SQLiteResultStore.TABLE} ADD COLUMN {quoted} {SQLiteResultStore._column_type(value)}")
+            index_name = SQLiteResultStore._quote(f"index_{column}")
+            self._connection.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {SQLiteResultStore.TABLE} ({quoted})")
+            self._columns.append(column)
+
+    def append(self, run: str, task_number: int, bundled_report: dict):
+        row = {"run": run, "task": task_number, "output": bundled_report["output"]}
+        for key, value in bundled_report["modified"].items():
+            row[SQLiteResultStore.MODIFIED_PREFIX + key] = SQLiteResultStore._cell(value)
+        for key, value in bundled_report["report"].items():
+            row[SQLiteResultStore.REPORT_PREFIX + key] = SQLiteResultStore._cell(value)
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_size or time.time() - self._last_commit_time >= self.commit_interval_second:
+            self.flush()
+
+    # Rows already stored are ignored
+    def restore(self, run: str, task_reports: Iterable[Tuple[int, dict]]):
+        for task_number, bundled_report in task_reports:
+            self.append(run, task_number, bundled_report)
+        self.flush()
+
+    def flush(self):
+        self._last_commit_time = time.time()
+        if len(self._pending) == 0:
+            return
+        with self._connection:
+            # New columns are typed by their first value that isn't None
+            new_values: Dict[str, Any] = {}
+            for row in self._pending:
+                for column, value in row.items():
+                    if column not in self._columns and new_values.get(column) is None:
+                        new_values[column] = value
+            self._add_columns(new_values)
+            # Rows with the same columns are inserted together
+            groups: Dict[Tuple[str, ...], List[Tuple[Any, ...]]] = {}
+            for row in self._pending:
+                groups.setdefault(tuple(row.keys()), []).append(tuple(row.values()))
+            for columns, values in groups.items():
+                column_names = ", ".join(SQLiteResultStore._quote(i) for i in columns)
+                placeholders = ", ".join("?" for _ in columns)
+                self._connection.executemany(f"INSERT OR IGNORE INTO {SQLiteResultStore.TABLE} ({column_names}) VALUES ({placeholders})", values)
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    # Map "numChildren" or "var" to "modified.numChildren" or "report.var"
+    def resolve_column(self, name: str) -> str:
+        if name in self._columns:
+            return name
+        for prefix in (SQLiteResultStore.MODIFIED_PREFIX, SQLiteResultStore.REPORT_PREFIX):
+            if prefix + name in self._columns:
+                return prefix + name
+        raise ValueError(f"Unknown column! {name}")
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    # Parse "numChildren>=4" into a condition
+    @staticmethod
+    def parse_condition(text: str) -> Condition:
+        match = SQLiteResultStore._CONDITION_PATTERN.match(text)
+        if match is None:
+            raise ValueError(f"Condition error! {text}")
+        key, operator, value = match.groups()
+        for value_type in (int, float):
+            try:
+                return key, operator, value_type(value)
+            except ValueError:
+                pass
+        return key, operator, value
+
+    # Yield rows as {column: value}, filtered by all conditions and ordered by an indexed column
+    def query(self, conditions: Optional[List[Condition]] = None, order_by: Optional[str] = None,
+              descending: bool = False, limit: Optional[int] = None, fetch_size: int = 1024) -> Iterator[Dict[str, Any]]:
+        self.flush()
+        sql = f"SELECT * FROM {SQLiteResultStore.TABLE}"
+        values = []
+        clauses = []
+        if conditions:
+            for key, operator, value in conditions:
+                if operator not in SQLiteResultStore.OPERATORS:
+                    raise ValueError(f"Operator error! {operator}")
+                clauses.append(f"{SQLiteResultStore._quote(self.resolve_column(key))} {operator} ?")
+                values.append(value)
+        order_column = None
+        if order_by is not None:
+            order_column = SQLiteResultStore._quote(self.resolve_column(order_by))
+            # Rows without the metric are skipped, so the index can serve top k
+            clauses.append(f"{order_column} IS NOT NULL")
+        if len(clauses) > 0:
+            sql += " WHERE " + " AND ".join(clauses)
+        if order_column is not None:
+            sql += f" ORDER BY {order_column} {'DESC' if descending else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(limit)
+        cursor = self._connection.execute(sql, values)
+        columns = [i[0] for i in cursor.description]
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if len(rows) == 0:
+                break
+            for row in rows:
+                yield dict(zip(columns, row))
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._connection.execute(f"SELECT COUNT(*) FROM {SQLiteResultStore.TABLE}").fetchone()[0]
+
+    def __repr__(self) -> str:
+        return f"SQLiteResultStore({self.db_path})"
+
+
+REPORT_BACKENDS = {
+    "csv": CSVResultStore,
+    "sqlite": SQLiteResultStore,
+}
+
+
+def open_result_store(report_path: str, backend: str = "csv") -> AbstractResultStore:
+    if backend not in REPORT_BACKENDS:
+        raise ValueError(f"Unknown report backend! {backend}")
+    return REPORT_BACKENDS[backend](report_path)
@@ -0,0 +1,87 @@
+import os
+import shutil
+import tarfile
+from typing import List, Optional, Tuple
+
+from epos_runner.analyzer import AbstractAnalyzer
+from epos_runner.epos_files import EPOSOutput
+
+
+class RetentionPolicy:
+    MODES = ("keep", "keep_used", "archive", "delete")
+    ARCHIVE_SUFFIX = ".tar.gz"
+
+    # mode "keep_used" keeps AbstractAnalyzer.required_outputs and used_conf.txt
+    # mode "archive" packs the output dir into <output dir>.tar.gz
+    # keep_top: full outputs of the best keep_top reports are kept in every mode
+    def __init__(self, mode: str = "keep", keep_top: int = 0):
+        if mode not in RetentionPolicy.MODES:
+            raise ValueError(f"Retention mode must be one of {RetentionPolicy.MODES}! {mode}")
+        if keep_top < 0:
+            raise ValueError("Keep top must >= 0!")
+        self.mode = mode
+        self.keep_top = keep_top
+
+    # Runs in the analysis processes, used_files=None keeps every file in "keep_used" mode
+    # sandbox_dir: working dir of the task holding output_dir, removed with it in "delete" mode
+    def apply(self, output_dir: str, used_files: Optional[List[str]], sandbox_dir: Optional[str] = None):
+        if self.mode == "delete" and sandbox_dir is not None:
+            shutil.rmtree(sandbox_dir, ignore_errors=True)
+            return
+        if self.mode == "keep" or not os.path.isdir(output_dir):
+            return
+        if self.mode == "keep_used":
+            if used_files is None:
+                return
+            kept = set(used_files)
+            kept.add(EPOSOutput.USED_CONF_TXT_FILE)
+            for name in os.listdir(output_dir):
+                if name in kept:
+                    continue
+                path = os.path.join(output_dir, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+        elif self.mode == "archive":
+            archive_path = output_dir + RetentionPolicy.ARCHIVE_SUFFIX
+            temp_path = archive_path + ".tmp"
+            with tarfile.open(temp_path, "w:gz", compresslevel=6) as tar:
+                tar.add(output_dir, arcname=os.path.basename(output_dir))
+            os.replace(temp_path, archive_path)
+            shutil.rmtree(output_dir, ignore_errors=True)
+        else:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    # Links to the shared conf and datasets are only needed while the task runs, an empty sandbox is removed
+    @staticmethod
+    def unlink_sandbox(sandbox_dir: str):
+        if not os.path.isdir(sandbox_dir):
+            return
+        for name in os.listdir(sandbox_dir):
+            path = os.path.join(sandbox_dir, name)
+            if os.path.islink(path):
+                os.remove(path)
+        if len(os.listdir(sandbox_dir)) == 0:
+            os.rmdir(sandbox_dir)
+
+    def __str__(self) -> str:
+        return f"{self.mode}, keep top: {self.keep_top}"
+
+
+class TopOutputs:
+    # Holds the output dirs of the best reports seen so far
+    def __init__(self, analyzer: AbstractAnalyzer, amount: int):
+        self.analyzer = analyzer
+        self.amount = amount
+        self._held: List[Tuple[dict, str]] = []
+
+    # Return output dirs which are no longer in the top, including output_dir if it never got in
+    def offer(self, report: dict, output_dir: str) -> List[str]:
+        candidates = self._held + [(report, output_dir)]
+        if len(candidates) <= self.amount:
+            self._held = candidates
+            return []
+        top_indexes = self.analyzer.top_results([i[0] for i in candidates], self.amount)
+        self._held = [candidates[i] for i in top_indexes]
+        return [candidates[i][1] for i in range(len(candidates)) if i not in top_indexes]
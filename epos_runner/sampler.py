@@ -0,0 +1,332 @@
+import hashlib
+import json
+import random
+from abc import abstractmethod
+from functools import reduce
+from itertools import product
+from typing import Dict, List, Any, Iterator, Optional, Union, Callable, Tuple
+
+
+class ParamRange:
+    # Inclusive low and high, integer ranges pick whole numbers
+    def __init__(self, low: float, high: float, integer: bool = False, precision: Optional[int] = None):
+        if low > high:
+            raise ValueError(f"Param range error! [{low}:{high}]")
+        self.low = low
+        self.high = high
+        self.integer = integer
+        self.precision = precision
+
+    # unit: float in [0, 1)
+    def value(self, unit: float) -> Union[int, float, str]:
+        if self.integer:
+            return min(int(self.low + unit * (self.high - self.low + 1)), int(self.high))
+        value = self.low + unit * (self.high - self.low)
+        if self.precision is not None:
+            # noinspection PyStringFormat
+            return f"%.{self.precision}f" % value
+        return value
+
+    def __repr__(self) -> str:
+        return f"ParamRange({self.low}, {self.high}, integer={self.integer}, precision={self.precision})"
+
+
+ParamValues = Union[List[Any], ParamRange]
+# Return False to drop a task, called with all properties of the task
+Constraint = Callable[[Dict[str, Any]], bool]
+
+
+def _text(value: Any) -> str:
+    return str(value).strip().strip("\"'")
+
+
+def _code_identity(code) -> list:
+    consts = [_code_identity(i) if hasattr(i, "co_code") else repr(i) for i in code.co_consts]
+    return [code.co_code.hex(), consts, list(code.co_names)]
+
+
+# Stable text of a constraint or condition: its bytecode, defaults and closure values, so an edited lambda is noticed
+# Other callables fall back to repr, which never matches again if it holds an address
+def callable_identity(function: Callable) -> str:
+    code = getattr(function, "__code__", None)
+    if code is None:
+        return repr(function)
+    closure = [repr(i.cell_contents) for i in (function.__closure__ or ())]
+    content = [getattr(function, "__qualname__", ""), _code_identity(code), repr(function.__defaults__), closure]
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+
+class Conditional:
+    # values only take effect when the condition holds, otherwise the template value is kept
+    # when: {property: allowed value or values}, condition: predicate on all properties of the task
+    # Conditions see the template and the params listed before this one
+    def __init__(self, values: Any, when: Optional[Dict[str, Any]] = None, condition: Optional[Constraint] = None):
+        if when is None and condition is None:
+            raise ValueError("Conditional param needs when or condition!")
+        if isinstance(values, Conditional):
+            raise ValueError("Conditional params can't be nested!")
+        self.values = values
+        self.when = when
+        self.condition = condition
+
+    def active(self, properties: Dict[str, Any]) -> bool:
+        if self.when is not None:
+            for key, allowed in self.when.items():
+                allowed_values = allowed if isinstance(allowed, (list, tuple, set)) else [allowed]
+                if key not in properties or _text(properties[key]) not in [_text(i) for i in allowed_values]:
+                    return False
+        return self.condition is None or bool(self.condition(properties))
+
+    def __repr__(self) -> str:
+        condition = getattr(self.condition, "__name__", repr(self.condition)) if self.condition is not None else None
+        return f"Conditional({self.values!r}, when={self.when!r}, condition={condition})"
+
+
+# Return params with sets sorted, so samples are stable between runs
+# Conditional params are sampled like plain ones, TaskFilter resolves them
+def normalize_params(params: Dict[str, Any], allow_range: bool = True) -> Dict[str, ParamValues]:
+    result = {}
+    for key, value in params.items():
+        if isinstance(value, Conditional):
+            value = value.values
+        if isinstance(value, ParamRange):
+            if not allow_range:
+                raise ValueError(f"Param range can't be used in a full grid! {key}")
+            result[key] = value
+        elif isinstance(value, set):
+            result[key] = sorted(value, key=str)
+        elif isinstance(value, list) or isinstance(value, tuple):
+            result[key] = list(value)
+        else:
+            raise ValueError("Params value must be list, tuple, set or ParamRange!")
+        if not isinstance(result[key], ParamRange) and len(result[key]) == 0:
+            raise ValueError(f"Params value can't be empty! {key}")
+    return result
+
+
+def _pick(values: ParamValues, unit: float) -> Any:
+    if isinstance(values, ParamRange):
+        return values.value(unit)
+    return values[min(int(unit * len(values)), len(values) - 1)]
+
+
+class TaskFilter:
+    # Resolve conditional params, drop tasks violating a constraint and tasks with the same properties as an earlier one
+    # distinct_samples: the sampler never repeats a sample (GridSampler), so only conditional params can make duplicates
+    def __init__(self, template: Dict[str, Any], params: Dict[str, Any], constraints: Optional[List[Constraint]] = None,
+                 distinct_samples: bool = False):
+        self.template = template
+        self.conditionals = [(key, value) for key, value in params.items() if isinstance(value, Conditional)]
+        self.constraints = constraints if constraints is not None else []
+        self.dedup = not distinct_samples or len(self.conditionals) > 0
+        # Samples dropped so far
+        self.dropped = 0
+        self._seen = set()
+
+    # True if tasks can be dropped, so the sampler count is only an upper bound
+    @property
+    def filtering(self) -> bool:
+        return self.dedup or len(self.constraints) > 0
+
+    # Template values are left out, so only the effective change of a task is hashed
+    def _digest(self, modified_values: Dict[str, Any]) -> bytes:
+        changed = []
+        for key, value in modified_values.items():
+            value = _text(value)
+            if key not in self.template or _text(self.template[key]) != value:
+                changed.append((str(key), value))
+        return hashlib.sha1(json.dumps(sorted(changed)).encode()).digest()
+
+    # Return (properties, modified values) without inactive conditional params, or None if the task is dropped
+    def apply(self, properties: Dict[str, Any], modified_values: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        for key, conditional in self.conditionals:
+            if key in modified_values and not conditional.active(properties):
+                del modified_values[key]
+                if key in self.template:
+                    properties[key] = self.template[key]
+                else:
+                    del properties[key]
+        for constraint in self.constraints:
+            if not constraint(properties):
+                self.dropped += 1
+                return None
+        if self.dedup:
+            digest = self._digest(modified_values)
+            if digest in self._seen:
+                self.dropped += 1
+                return None
+            self._seen.add(digest)
+        return properties, modified_values
+
+    # Modified values of the tasks kept from samples
+    def samples(self, samples: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for modified_values in samples:
+            properties = dict(self.template)
+            properties.update(modified_values)
+            result = self.apply(properties, dict(modified_values))
+            if result is not None:
+                yield result[1]
+
+
+class AbstractSampler:
+    # Yield modified values of every task
+    @abstractmethod
+    def samples(self, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        pass
+
+    # Amount of samples() without generating them
+    @abstractmethod
+    def count(self, params: Dict[str, Any]) -> int:
+        pass
+
+
+class GridSampler(AbstractSampler):
+    def samples(self, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        params = normalize_params(params, allow_range=False)
+        keys = list(params.keys())
+        for values in product(*params.values()):
+            yield dict(zip(keys, values))
+
+    def count(self, params: Dict[str, Any]) -> int:
+        return reduce(lambda amount, values: amount * len(values), normalize_params(params, allow_range=False).values(), 1)
+
+    def __repr__(self) -> str:
+        return "GridSampler()"
+
+
+# Fixed list of modified values, params are ignored
+class ListSampler(AbstractSampler):
+    def __init__(self, samples: List[Dict[str, Any]]):
+        self._samples = samples
+
+    def samples(self, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        return iter(self._samples)
+
+    def count(self, params: Dict[str, Any]) -> int:
+        return len(self._samples)
+
+    # Short digest keeps logs readable and still tells different lists apart
+    def __repr__(self) -> str:
+        digest = hashlib.sha1(json.dumps(self._samples, sort_keys=True, default=str).encode()).hexdigest()[:12]
+        return f"ListSampler({len(self._samples)} samples, {digest})"
+
+
+# Samples in the unit hypercube are mapped to discrete lists or ranges
+class _UnitSampler(AbstractSampler):
+    # Samplers drawing random numbers get a concrete seed when none is given, so every call yields the same samples
+    # and the seed in repr keeps an executor dir from being resumed with a different sample set
+    _RANDOM = True
+
+    def __init__(self, budget: int, seed: Optional[int] = None):
+        if budget < 1:
+            raise ValueError("Sample budget must >= 1!")
+        self.budget = budget
+        if seed is None and self._RANDOM:
+            seed = random.SystemRandom().randrange(1 << 31)
+        self.seed = seed
+
+    @abstractmethod
+    def _units(self, dimension: int) -> Iterator[List[float]]:
+        pass
+
+    def samples(self, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        params = normalize_params(params)
+        keys = list(params.keys())
+        for units in self._units(len(keys)):
+            yield {key: _pick(params[key], unit) for key, unit in zip(keys, units)}
+
+    def count(self, params: Dict[str, Any]) -> int:
+        return self.budget
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(budget={self.budget}, seed={self.seed})"
+
+
+class RandomSampler(_UnitSampler):
+    def _units(self, dimension: int) -> Iterator[List[float]]:
+        rand = random.Random(self.seed)
+        for _ in range(self.budget):
+            yield [rand.random() for _ in range(dimension)]
+
+
+class LatinHypercubeSampler(_UnitSampler):
+    # Every dimension is split into budget strata and each stratum is used once
+    def _units(self, dimension: int) -> Iterator[List[float]]:
+        rand = random.Random(self.seed)
+        strata = []
+        for _ in range(dimension):
+            column = list(range(self.budget))
+            rand.shuffle(column)
+            strata.append(column)
+        for i in range(self.budget):
+            yield [(strata[d][i] + rand.random()) / self.budget for d in range(dimension)]
+
+
+class SobolSampler(_UnitSampler):
+    # Deterministic without a seed
+    _RANDOM = False
+    _BITS = 30
+    # (degree, polynomial coefficients, initial direction numbers) of dimension 2 to 21, Joe and Kuo (2008)
+    _DIRECTION_NUMBERS = [
+        (1, 0, [1]),
+        (2, 1, [1, 3]),
+        (3, 1, [1, 3, 1]),
+        (3, 2, [1, 1, 1]),
+        (4, 1, [1, 1, 3, 3]),
+        (4, 4, [1, 3, 5, 13]),
+        (5, 2, [1, 1, 5, 5, 17]),
+        (5, 4, [1, 1, 5, 5, 5]),
+        (5, 7, [1, 1, 7, 11, 19]),
+        (5, 11, [1, 1, 5, 1, 1]),
+        (5, 13, [1, 1, 1, 3, 11]),
+        (5, 14, [1, 3, 5, 5, 31]),
+        (6, 1, [1, 3, 3, 9, 7, 49]),
+        (6, 13, [1, 1, 1, 15, 21, 21]),
+        (6, 16, [1, 3, 1, 13, 27, 49]),
+        (6, 19, [1, 1, 1, 15, 7, 5]),
+        (6, 22, [1, 3, 1, 15, 13, 25]),
+        (6, 25, [1, 1, 5, 5, 19, 61]),
+        (7, 1, [1, 3, 7, 11, 23, 15, 103]),
+        (7, 4, [1, 3, 7, 13, 13, 15, 69]),
+    ]
+    MAX_DIMENSION = len(_DIRECTION_NUMBERS) + 1
+
+    @staticmethod
+    def _direction_vectors(dimension: int) -> List[List[int]]:
+        bits = SobolSampler._BITS
+        result = [[1 << (bits - 1 - k) for k in range(bits)]]
+        for degree, coefficients, initial in SobolSampler._DIRECTION_NUMBERS[:dimension - 1]:
+            vectors = [0] * bits
+            for k in range(bits):
+                if k < degree:
+                    vectors[k] = initial[k] << (bits - 1 - k)
+                else:
+                    value = vectors[k - degree] ^ (vectors[k - degree] >> degree)
+                    for j in range(1, degree):
+                        if (coefficients >> (degree - 1 - j)) & 1:
+                            value ^= vectors[k - j]
+                    vectors[k] = value
+            result.append(vectors)
+        return result
+
+    # Gray code construction, a seed applies a random digital shift
+    def _units(self, dimension: int) -> Iterator[List[float]]:
+        if dimension > SobolSampler.MAX_DIMENSION:
+            raise ValueError(f"Sobol sampler supports at most {SobolSampler.MAX_DIMENSION} params!")
+        bits = SobolSampler._BITS
+        vectors = SobolSampler._direction_vectors(dimension)
+        if self.seed is None:
+            shifts = [0] * dimension
+        else:
+            rand = random.Random(self.seed)
+            shifts = [rand.getrandbits(bits) for _ in range(dimension)]
+        points = [0] * dimension
+        scale = float(1 << bits)
+        for i in range(self.budget):
+            yield [(points[d] ^ shifts[d]) / scale for d in range(dimension)]
+            # Index of the lowest zero bit of i
+            c = 0
+            while (i >> c) & 1:
+                c += 1
+            for d in range(dimension):
+                points[d] ^= vectors[d][c]
@@ -0,0 +1,94 @@
+import json
+import math
+from typing import Dict, List, Any, Callable, Iterator, Tuple, Optional
+
+from epos_runner.analyzer import AbstractAnalyzer
+from epos_runner.log import logger
+from epos_runner.paraller_executor import ParallerExecutor
+from epos_runner.sampler import AbstractSampler, ListSampler, Constraint, TaskFilter
+
+# Create an executor running the given tasks with the other settings from config.py
+ExecutorFactory = Callable[[AbstractSampler], ParallerExecutor]
+
+
+def _config_key(config: Dict[str, Any]) -> str:
+    return json.dumps(sorted(config.items()), default=str)
+
+
+class SuccessiveHalvingSearch:
+    ITERATIONS_KEY = "numIterations"
+    SIMULATIONS_KEY = "numSimulations"
+
+    # Full numIterations and numSimulations are taken from the template
+    def __init__(self, sampler: AbstractSampler, min_iterations: int, min_simulations: int = 1, eta: int = 3):
+        if eta < 2:
+            raise ValueError("Eta must >= 2!")
+        if min_iterations < 1 or min_simulations < 1:
+            raise ValueError("Min iterations and simulations must >= 1!")
+        self.sampler = sampler
+        self.min_iterations = min_iterations
+        self.min_simulations = min_simulations
+        self.eta = eta
+
+    # Index of the last rung
+    def _max_rung(self, max_iterations: int) -> int:
+        if max_iterations <= self.min_iterations:
+            return 0
+        return int(math.floor(math.log(max_iterations / self.min_iterations, self.eta) + 1e-9))
+
+    # Return modified fidelity values of a rung, the last rung runs at full fidelity
+    def _fidelity(self, rung: int, max_rung: int, max_iterations: int, max_simulations: int) -> Dict[str, int]:
+        ratio = self.eta ** (rung - max_rung)
+        return {
+            SuccessiveHalvingSearch.ITERATIONS_KEY: max(self.min_iterations, int(round(max_iterations * ratio))),
+            SuccessiveHalvingSearch.SIMULATIONS_KEY: max(self.min_simulations, int(round(max_simulations * ratio))),
+        }
+
+    # Run configs from start_rung to the last rung, return bundled reports of the last rung
+    def _successive_halving(self, create_executor: ExecutorFactory, analyzer: AbstractAnalyzer, configs: List[Dict[str, Any]],
+                            start_rung: int, max_rung: int, max_iterations: int, max_simulations: int) -> List[dict]:
+        bundled_reports = []
+        for rung in range(start_rung, max_rung + 1):
+            fidelity = self._fidelity(rung, max_rung, max_iterations, max_simulations)
+            logger.info(f"Rung {rung}/{max_rung}: {len(configs)} configs with {fidelity}")
+            tasks = [dict(config, **fidelity) for config in configs]
+            bundled_reports = create_executor(ListSampler(tasks)).run()
+            if rung == max_rung or len(bundled_reports) == 0:
+                break
+            keep_amount = max(1, len(configs) // self.eta)
+            top_indexes = analyzer.top_results([i["report"] for i in bundled_reports], keep_amount)
+            configs_by_key = {_config_key(dict(config, **fidelity)): config for config in configs}
+            configs = [configs_by_key[_config_key(bundled_reports[i]["modified"])] for i in top_indexes]
+        return bundled_reports
+
+    def _max_fidelity(self, template: Dict[str, Any]) -> Tuple[int, int]:
+        return int(template[SuccessiveHalvingSearch.ITERATIONS_KEY]), int(template[SuccessiveHalvingSearch.SIMULATIONS_KEY])
+
+    # Return bundled reports at full fidelity
+    # Configs are resolved and filtered like the tasks of an executor, so no budget is spent on duplicates
+    def run(self, create_executor: ExecutorFactory, template: Dict[str, Any], params: Dict[str, Any], analyzer: AbstractAnalyzer,
+            constraints: Optional[List[Constraint]] = None) -> List[dict]:
+        max_iterations, max_simulations = self._max_fidelity(template)
+        configs = list(TaskFilter(template, params, constraints).samples(self.sampler.samples(params)))
+        return self._successive_halving(create_executor, analyzer, configs, 0, self._max_rung(max_iterations), max_iterations, max_simulations)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(sampler={self.sampler}, min_iterations={self.min_iterations}, min_simulations={self.min_simulations}, eta={self.eta})"
+
+
+class HyperbandSearch(SuccessiveHalvingSearch):
+    # Brackets trade the amount of configs against their starting fidelity, every bracket draws new configs from the sampler
+    def run(self, create_executor: ExecutorFactory, template: Dict[str, Any], params: Dict[str, Any], analyzer: AbstractAnalyzer,
+            constraints: Optional[List[Constraint]] = None) -> List[dict]:
+        max_iterations, max_simulations = self._max_fidelity(template)
+        max_rung = self._max_rung(max_iterations)
+        samples: Iterator[Dict[str, Any]] = TaskFilter(template, params, constraints).samples(self.sampler.samples(params))
+        bundled_reports = []
+        for bracket in range(max_rung, -1, -1):
+            config_amount = int(math.ceil((max_rung + 1) / (bracket + 1) * self.eta ** bracket))
+            configs = [config for _, config in zip(range(config_amount), samples)]
+            if len(configs) == 0:
+                break
+            logger.info(f"Bracket {max_rung - bracket + 1}/{max_rung + 1}: {len(configs)} configs")
+            bundled_reports.extend(self._successive_halving(create_executor, analyzer, configs, max_rung - bracket, max_rung, max_iterations, max_simulations))
+        return bundled_reports
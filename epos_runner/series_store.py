@@ -0,0 +1,181 @@
+import os
+import time
+import uuid
+from typing import Dict, List, Any, Optional, Tuple
+
+from epos_runner.epos_files import EPOSOutput
+from epos_runner.log import logger
+from epos_runner.output_reader import EPOSOutputReader, np
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# {column: array} of one source file
+Columns = Dict[str, "np.ndarray"]
+
+DEFAULT_SERIES_FILES = [
+    EPOSOutput.GLOBAL_COST_CSV_FILE,
+    EPOSOutput.UNFAIRNESS_CSV_FILE,
+    EPOSOutput.LOCAL_COST_CSV_FILE,
+    EPOSOutput.GLOBAL_RESPONSE_CSV_FILE,
+]
+
+
+def parquet_available() -> bool:
+    return pyarrow is not None
+
+
+# "Iteration,Mean,Stdev,Run-0,Run-1,..." becomes one row per (iteration, simulation), other files keep their columns
+def _to_columns(columns: Optional[List[str]], data: "np.ndarray") -> Columns:
+    if columns is not None and columns[0] == "Iteration" and any(i.startswith("Run-") for i in columns):
+        # Repeated header rows are nan
+        data = data[~np.isnan(data[:, 0])]
+        runs = [i for i, name in enumerate(columns) if name.startswith("Run-")]
+        values = data[:, runs]
+        return {
+            "iteration": np.repeat(data[:, 0].astype(np.int64), len(runs)),
+            "simulation": np.tile(np.arange(len(runs), dtype=np.int64), data.shape[0]),
+            "value": values.ravel(),
+        }
+    if columns is None:
+        columns = [f"column-{i}" for i in range(data.shape[1])]
+    return {name: data[:, i] for i, name in enumerate(columns)}
+
+
+# Runs in the analysis processes, missing files are skipped
+def extract_series(output_dir: str, file_names: List[str]) -> Dict[str, Columns]:
+    reader = EPOSOutputReader(output_dir)
+    result = {}
+    for file_name in file_names:
+        if not os.path.isfile(os.path.join(output_dir, file_name)):
+            continue
+        table = reader.table(file_name)
+        if len(table) > 0:
+            result[file_name] = _to_columns(table.columns, table.data)
+    return result
+
+
+def _concatenate(parts: List[Columns]) -> Columns:
+    names = []
+    for part in parts:
+        names.extend(i for i in part.keys() if i not in names)
+    result = {}
+    for name in names:
+        # A column missing in some parts, e.g. a param added by a search round, is filled with "" or nan
+        fill_value = "" if name.startswith("modified.") else np.nan
+        result[name] = np.concatenate([i[name] if name in i else np.full(len(next(iter(i.values()))), fill_value) for i in parts])
+    return result
+
+
+class SeriesStore:
+    _PARQUET_SUFFIX = ".parquet"
+    _NUMPY_SUFFIX = ".npz"
+
+    # Every source file is a dataset dir of part files, written as Parquet with pyarrow or as .npz without it
+    # Buffers of all files are written together once a file has part_rows rows, flush_tasks tasks are buffered
+    # or flush_interval_second passed, so a killed run loses at most that much
+    def __init__(self, dataset_dir: str, file_names: Optional[List[str]] = None, part_rows: int = 1000000,
+                 flush_tasks: int = 1000, flush_interval_second: float = 60.0):
+        if np is None:
+            raise ImportError("SeriesStore requires numpy!")
+        if part_rows < 1:
+            raise ValueError("Part rows must >= 1!")
+        if flush_tasks < 1:
+            raise ValueError("Flush tasks must >= 1!")
+        self.dataset_dir = dataset_dir
+        self.file_names = list(file_names) if file_names is not None else list(DEFAULT_SERIES_FILES)
+        self.part_rows = part_rows
+        self.flush_tasks = flush_tasks
+        self.flush_interval_second = flush_interval_second
+        # {file name: buffered column dicts of several tasks}
+        self._buffers: Dict[str, List[Columns]] = {i: [] for i in self.file_names}
+        self._buffered_rows: Dict[str, int] = {i: 0 for i in self.file_names}
+        # (run, task number) of the buffered series
+        self._buffered_tasks: List[Tuple[str, int]] = []
+        self._last_flush_time = time.time()
+
+    @staticmethod
+    def _table_name(file_name: str) -> str:
+        return os.path.splitext(file_name)[0]
+
+    def _table_dir(self, file_name: str) -> str:
+        return os.path.join(self.dataset_dir, SeriesStore._table_name(file_name))
+
+    # Tag every row with the task and its modified values
+    # Return (run, task number) of the tasks whose series were written to parts by this call
+    def append(self, run: str, task_number: int, modified_values: Dict[str, Any], series: Dict[str, Columns]) -> List[Tuple[str, int]]:
+        for file_name, columns in series.items():
+            if file_name not in self._buffers:
+                continue
+            rows = len(next(iter(columns.values())))
+            tagged = {
+                "run": np.full(rows, run),
+                "task": np.full(rows, task_number, dtype=np.int64),
+            }
+            for key, value in sorted(modified_values.items()):
+                tagged[f"modified.{key}"] = np.full(rows, str(value))
+            tagged.update(columns)
+            self._buffers[file_name].append(tagged)
+            self._buffered_rows[file_name] += rows
+        self._buffered_tasks.append((run, task_number))
+        if (len(self._buffered_tasks) >= self.flush_tasks or max(self._buffered_rows.values(), default=0) >= self.part_rows
+                or time.time() - self._last_flush_time >= self.flush_interval_second):
+            return self.flush()
+        return []
+
+    def _flush_file(self, file_name: str):
+        buffers = self._buffers[file_name]
+        if len(buffers) == 0:
+            return
+        columns = _concatenate(buffers)
+        table_dir = self._table_dir(file_name)
+        if not os.path.isdir(table_dir):
+            os.makedirs(table_dir)
+        part_name = f"part-{uuid.uuid4().hex}"
+        temp_path = os.path.join(table_dir, f".{part_name}.tmp")
+        if pyarrow is not None:
+            part_path = os.path.join(table_dir, part_name + SeriesStore._PARQUET_SUFFIX)
+            pyarrow.parquet.write_table(pyarrow.table(columns), temp_path, compression="zstd")
+        else:
+            part_path = os.path.join(table_dir, part_name + SeriesStore._NUMPY_SUFFIX)
+            with open(temp_path, "wb") as f:
+                np.savez_compressed(f, **columns)
+        # Readers never see half written parts
+        os.replace(temp_path, part_path)
+        logger.debug(f"Series part written: {part_path} ({self._buffered_rows[file_name]} rows)")
+        self._buffers[file_name] = []
+        self._buffered_rows[file_name] = 0
+
+    # Return (run, task number) of the tasks whose series were written
+    def flush(self) -> List[Tuple[str, int]]:
+        for file_name in self.file_names:
+            self._flush_file(file_name)
+        flushed = self._buffered_tasks
+        self._buffered_tasks = []
+        self._last_flush_time = time.time()
+        return flushed
+
+    # Return {column: array} of all parts of a source file, columns=None reads every column
+    @staticmethod
+    def read(dataset_dir: str, file_name: str, columns: Optional[List[str]] = None) -> Columns:
+        table_dir = os.path.join(dataset_dir, SeriesStore._table_name(file_name))
+        if not os.path.isdir(table_dir):
+            raise IOError(f"Series can't be found in: {table_dir}")
+        parts: List[Columns] = []
+        for part_name in sorted(os.listdir(table_dir)):
+            part_path = os.path.join(table_dir, part_name)
+            if part_name.endswith(SeriesStore._PARQUET_SUFFIX):
+                if pyarrow is None:
+                    raise ImportError(f"Reading {part_path} requires pyarrow!")
+                table = pyarrow.parquet.read_table(part_path, columns=columns)
+                parts.append({name: table.column(name).to_numpy() for name in table.column_names})
+            elif part_name.endswith(SeriesStore._NUMPY_SUFFIX):
+                with np.load(part_path) as part:
+                    parts.append({name: part[name] for name in (columns if columns is not None else part.files)})
+        return _concatenate(parts)
+
+    def __repr__(self) -> str:
+        return f"SeriesStore({self.dataset_dir}, {'parquet' if pyarrow is not None else 'npz'})"
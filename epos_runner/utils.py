@@ -2,9 +2,10 @@ import csv
 import os
 import sys
 from itertools import product
-from typing import Union, Tuple, List
+from typing import Union, Tuple, List, Optional
 
 from epos_runner import EPOSOutput
+from epos_runner.output_reader import EPOSOutputReader, numpy_available, np
 
 
 # range: Union[float, Tuple[float, float, float]] -> (specific float) or (inclusive start, exclusive end, step)
@@ -43,26 +44,60 @@ def generate_weights(alpha_range: Union[float, Tuple[float, float, float]],
     return result
 
 
+def _minium_global_cost_csv(csv_file_path: str) -> dict:
+    min_cost = {
+        "iteration": None,
+        "run": None,
+        "var": sys.float_info.max
+    }
+    with open(csv_file_path, "r") as f:
+        skip_head = False
+        for row in csv.reader(f.readlines()):
+            if not skip_head or row[0] == "Iteration":
+                skip_head = True
+                continue
+            for i in range(3, len(row)):
+                value = float(row[i])
+                if value < min_cost["var"]:
+                    min_cost["iteration"] = int(row[0])
+                    min_cost["run"] = f"Run-{i - 3}"
+                    min_cost["var"] = value
+    return min_cost
+
+
+def _minium_global_cost_numpy(output_dir: str) -> dict:
+    data = EPOSOutputReader(output_dir).global_cost.data
+    # Repeated header rows are nan
+    data = data[~np.isnan(data[:, 0])]
+    costs = data[:, 3:]
+    if costs.size == 0 or np.all(np.isnan(costs)):
+        return {"iteration": None, "run": None, "var": sys.float_info.max}
+    # First minimum in row order, same as the csv version
+    row, column = np.unravel_index(np.nanargmin(costs), costs.shape)
+    return {"iteration": int(data[row, 0]), "run": f"Run-{column}", "var": float(costs[row, column])}
+
+
 def report_minium_global_cost(output_dir: str) -> dict:
     csv_file_path = os.path.join(output_dir, EPOSOutput.GLOBAL_COST_CSV_FILE)
     if os.path.isfile(csv_file_path):
-        min_cost = {
-            "iteration": None,
-            "run": None,
-            "var": sys.float_info.max
-        }
-        with open(csv_file_path, "r") as f:
-            skip_head = False
-            for row in csv.reader(f.readlines()):
-                if not skip_head or row[0] == "Iteration":
-                    skip_head = True
-                    continue
-                for i in range(3, len(row)):
-                    value = float(row[i])
-                    if value < min_cost["var"]:
-                        min_cost["iteration"] = int(row[0])
-                        min_cost["run"] = f"Run-{i - 3}"
-                        min_cost["var"] = value
-        return min_cost
+        if numpy_available():
+            return _minium_global_cost_numpy(output_dir)
+        return _minium_global_cost_csv(csv_file_path)
     else:
         raise IOError(f"Global cost csv can't be found in: {csv_file_path}")
+
+
+# Prune a run whose lowest global cost after min_iterations rows is still worse than the best report
+# Rows still being written by EPOS, or without any run column, are skipped
+def prune_by_global_cost(rows: List[List[str]], best_report: Optional[dict], min_iterations: int) -> bool:
+    if best_report is None or len(rows) < min_iterations:
+        return False
+    costs = []
+    for row in rows:
+        try:
+            costs.extend([float(row[i]) for i in range(3, len(row))])
+        except ValueError:
+            continue
+    if len(costs) == 0:
+        return False
+    return min(costs) > best_report["var"]
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import os
+import sys
+
+from epos_runner.result_store import SQLiteResultStore
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query reports stored with REPORT_BACKEND = \"sqlite\"")
+    parser.add_argument("db_path", help="SQLite report path")
+    parser.add_argument("--where", metavar="CONDITION", action="append", default=[],
+                        help="Filter by a param or report value, e.g. 'numChildren>=4', can be repeated")
+    parser.add_argument("--top", metavar="K", type=int, help="Only the best K rows of --metric")
+    parser.add_argument("--metric", help="Sort by this param or report value")
+    parser.add_argument("--desc", action="store_true", help="Higher --metric is better")
+    parser.add_argument("--export", metavar="CSV_PATH", help="Write rows to a csv file instead of stdout")
+    parser.add_argument("--columns", action="store_true", help="List columns and exit")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.isfile(args.db_path):
+        raise ValueError(f"Can't find report '{args.db_path}'")
+    if args.top is not None and args.metric is None:
+        raise ValueError("--top requires --metric!")
+    store = SQLiteResultStore(args.db_path)
+    try:
+        if args.columns:
+            for column in store.columns:
+                print(column)
+            return
+        conditions = [SQLiteResultStore.parse_condition(i) for i in args.where]
+        rows = store.query(conditions, order_by=args.metric, descending=args.desc, limit=args.top)
+        if args.export is not None:
+            f = open(args.export, "w", newline="")
+        else:
+            f = sys.stdout
+        try:
+            writer = csv.writer(f)
+            writer.writerow(store.columns)
+            amount = 0
+            for row in rows:
+                writer.writerow([row[i] for i in store.columns])
+                amount += 1
+        finally:
+            if f is not sys.stdout:
+                f.close()
+        if args.export is not None:
+            print(f"{amount} rows exported to {args.export}")
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()